@@ -2,6 +2,8 @@
 Module containing all required algorithms
 """
 
-from algorithms.manepi import manepi
+from algorithms.manepi import manepi, derive_min_sup
+from algorithms.approximate import approximate_manepi
+from algorithms.rolling import RollingMiner
 from algorithms.sax import sax
 
@@ -0,0 +1,129 @@
+"""
+Approximate MANEPI+ which estimates the supports of episodes from a
+random sample of windows of the event sequence, for quickly exploring
+parameters on long event sequences.
+"""
+
+import math
+import random
+from algorithms.manepi import manepi, concat_minimal_occurrences, calculate_support
+from structures import FrequentEpisodePrefixTree
+
+# Lowest support threshold to mine the sample with. Sample supports are counts, whose relative
+# spread grows as they get smaller, and the number of frequent episodes explodes as the threshold
+# approaches 1, so the sample is grown until an episode at the threshold is expected this often.
+MIN_SAMPLE_SUPPORT = 20
+
+
+def approximate_manepi(event_sequence, min_sup, min_conf, sample_rate=0.1, window_length=100, error=0.1, verify=False, seed=None):
+    """
+    Performs MANEPI+ on a random sample of non-overlapping windows of
+    the event sequence, returning a provisional FEPT whose supports are
+    estimated by scaling the supports within the sample up to the full
+    event sequence.
+
+    The sampled windows are mined as one sequence, but only occurrences
+    within a single window are counted, as an occurrence crossing from
+    one window into the next would skip the events in between and does
+    not exist in the event sequence.
+
+    args:
+        event_sequence: The event sequence to perform the algorithm on.
+        min_sup: The minimum support threshold of the full event sequence.
+        min_conf: The minimum confidence threshold.
+        sample_rate: The fraction of windows to sample - Range: (0 1]. More windows are sampled
+            when the support threshold of the sample would otherwise be below MIN_SAMPLE_SUPPORT,
+            and when the whole event sequence is needed it is mined exactly instead.
+        window_length: The number of events in each window.
+        error: The relative error allowed for estimated supports. Episodes are mined from the
+            sample with a support threshold lowered by this fraction, so larger errors miss
+            fewer frequent episodes at the cost of more infrequent ones.
+        verify: Compute the exact support of every mined episode against the full event sequence,
+            only keeping the ones which are actually frequent.
+        seed: Optional seed for sampling the windows.
+    """
+
+    if not 0 < sample_rate <= 1:
+        raise Exception("Invalid sample rate, expected a value in (0 1]")
+
+    if min_sup < 1:
+        raise Exception("Invalid minimum support, expected at least 1")
+
+    if not 0 <= error < 1:
+        raise Exception("Invalid error, expected a value in [0 1)")
+
+    if window_length < 1:
+        raise Exception("Invalid window length, expected at least 1")
+
+    # Sample enough of the event sequence for the threshold of the sample to stay meaningful
+    sample_rate = max(sample_rate, MIN_SAMPLE_SUPPORT / (min_sup * (1 - error)))
+    if sample_rate >= 1:
+        return manepi(event_sequence, min_sup, min_conf)
+
+    # Sample windows, keeping them in order so the times of the sample still increase
+    n_windows = -(-len(event_sequence) // window_length)
+    n_samples = min(n_windows, math.ceil(sample_rate * n_windows))
+    windows = sorted(random.Random(seed).sample(range(n_windows), n_samples))
+
+    sample = [event for window in windows
+              for event in event_sequence[window * window_length:(window + 1) * window_length]]
+
+    # Scale the support threshold down to the size of the sample
+    fraction = len(sample) / len(event_sequence)
+    sample_min_sup = max(1, int(min_sup * fraction * (1 - error)))
+
+    window_starts = [event_sequence[window * window_length].time
+                     for window in windows]
+    FEPT = manepi(sample, sample_min_sup, min_conf,
+                  window_starts=window_starts)
+
+    if verify:
+        return verify_episodes(FEPT, event_sequence, min_sup, min_conf)
+
+    # Estimate the supports within the full event sequence
+    nodes = list(FEPT.root.children.values())
+    for node in nodes:
+        node.support = round(node.support / fraction)
+        nodes.extend(node.children.values())
+
+    FEPT.set_min_sup(min_sup)
+    return FEPT
+
+
+def verify_episodes(candidates, event_sequence, min_sup, min_conf):
+    """
+    Computes the exact supports of the episodes in a provisional FEPT
+    against the full event sequence, returning a new FEPT with only
+    the episodes which are frequent. The minimal occurrences of each
+    episode are built from those of its prefix, and an infrequent
+    episode's descendants are skipped as they cannot be frequent either.
+    """
+
+    FEPT = FrequentEpisodePrefixTree()
+    FEPT.set_min_conf(min_conf)
+    FEPT.set_min_sup(min_sup)
+
+    occurrences = {}
+    for event in event_sequence:
+        occurrences.setdefault(event.type, []).append([event.time] * 2)
+
+    FEPT.set_frequent_one_episodes(sorted(
+        (event_type, occurrences[event_type]) for event_type in candidates.root.children if len(occurrences[event_type]) >= min_sup))
+
+    def verify(candidate, minimal_occurrences):
+        for event_type, child in candidate.children.items():
+            child_minimal_occurrences = concat_minimal_occurrences(
+                minimal_occurrences, occurrences[event_type])
+
+            if len(child_minimal_occurrences) < min_sup:
+                continue
+
+            if (support := calculate_support(child_minimal_occurrences)) >= min_sup:
+                FEPT.insert(child.label, None, support)
+                verify(child, child_minimal_occurrences)
+
+    for event_type, one_episode_occurrences in FEPT.frequent_one_episodes:
+        FEPT.insert([event_type], None, len(one_episode_occurrences))
+        verify(candidates.root.children[event_type], one_episode_occurrences)
+
+    return FEPT
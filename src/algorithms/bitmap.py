@@ -0,0 +1,158 @@
+"""
+Bitmap operations for the bitmap engine of MANEPI+. The occurrences of
+an event type are stored as a Python integer with bit t set if the
+event type occurs at time t, so that occurrences can be filtered,
+counted and searched with shifts and masks on whole machine words.
+"""
+
+from bisect import bisect_left
+
+
+def to_bitmap(occurrences):
+    """
+    Convert a list of [time, time] occurrences into a bitmap
+    """
+
+    bitmap = 0
+    for occurrence in occurrences:
+        bitmap |= 1 << occurrence[0]
+
+    return bitmap
+
+
+def popcount(bitmap):
+    """
+    Count the set bits of a bitmap
+    """
+
+    return bitmap.bit_count()
+
+
+if not hasattr(int, "bit_count"):
+    def popcount(bitmap):
+        """
+        Count the set bits of a bitmap, for Python versions before 3.10
+        """
+
+        return bin(bitmap).count("1")
+
+
+def lowest_bit(bitmap):
+    """
+    Get the position of the lowest set bit of a non-empty bitmap
+    """
+
+    return (bitmap & -bitmap).bit_length() - 1
+
+
+def set_times(bitmap):
+    """
+    Iterate over the times at which bits of a bitmap are set, from the lowest
+    """
+
+    while bitmap:
+        time = lowest_bit(bitmap)
+        bitmap ^= 1 << time
+        yield time
+
+
+def after(bitmap, time):
+    """
+    Keep only the set bits of a bitmap after a given time
+    """
+
+    return bitmap >> (time + 1) << (time + 1)
+
+
+def next_times(bitmap):
+    """
+    Build a table of the first time at or after each time at which a bit
+    of the bitmap is set, or None if there is no such time
+    """
+
+    # The bits of the bitmap from the lowest to the highest
+    bits = bin(bitmap)[:1:-1]
+
+    table = [None] * (len(bits) + 1)
+
+    time = None
+    for i in range(len(bits) - 1, -1, -1):
+        if bits[i] == "1":
+            time = i
+        table[i] = time
+
+    return table
+
+
+def previous_time(bitmap, time):
+    """
+    Get the last time before a given time at which a bit is set
+    """
+
+    return (bitmap & ((1 << time) - 1)).bit_length() - 1
+
+
+def bitmap_support(label, next_time_tables):
+    """
+    Computes the cardinality of the first largest set of minimal and
+    non-overlapping occurrences of an episode. Matching the episode's
+    events at their earliest times gives the occurrence which ends
+    first, and repeating this after the end of each occurrence gives
+    the same occurrences as calculate_support. Each step of the match
+    is a single lookup in the next time table of an event type.
+    """
+
+    tables = [next_time_tables[event_type] for event_type in label]
+
+    support = 0
+    time = 0
+    while True:
+        for table in tables:
+            if time >= len(table) or (time := table[time]) is None:
+                return support
+            time += 1
+
+        support += 1
+
+
+def search_support(label, start_times):
+    """
+    Computes the same support as bitmap_support without next time tables,
+    with a binary search in the sorted times of an event type at each step
+    of the match. It is slower, but takes no memory beyond the times.
+    """
+
+    times = [start_times[event_type] for event_type in label]
+
+    support = 0
+    time = 0
+    while True:
+        for starts in times:
+            i = bisect_left(starts, time)
+            if i == len(starts):
+                return support
+            time = starts[i] + 1
+
+        support += 1
+
+
+def bitmap_minimal_occurrences(label, ends, bitmaps):
+    """
+    Computes the minimal occurrences of an episode from the bitmap of their
+    end times, the same as concat_minimal_occurrences. The start of each
+    occurrence is found by matching the episode backwards from its end at
+    the latest possible times.
+    """
+
+    minimal_occurrences = []
+    while ends:
+        end = lowest_bit(ends)
+        ends ^= 1 << end
+
+        start = end
+        for event_type in reversed(label[:-1]):
+            start = previous_time(bitmaps[event_type], start)
+
+        minimal_occurrences.append([start, end])
+
+    return minimal_occurrences
@@ -6,15 +6,62 @@ Author: Nerius Ilmonas
 Date: 09/03/2021
 """
 
+from bisect import bisect_left, bisect_right
+
 # Import all required data structures
 from structures import FrequentEpisodePrefixTree
+from algorithms.bitmap import to_bitmap, popcount, lowest_bit, set_times, after, next_times, bitmap_support, search_support, bitmap_minimal_occurrences
 
 
 # Create global variable for frequent episode prefix tree
 FEPT = None
 
+# Optional statistics collector, see utils.profiler.MiningStats
+STATS = None
+
+# Which frequent episodes are stored in the FEPT
+EPISODE_MODES = ["all", "closed", "maximal"]
+EPISODE_MODE = "all"
+
+# Episodes into which an event can be inserted without changing their minimal occurrences,
+# which are not grown when only mining closed or maximal episodes
+COVERED = set()
+
+# Times of the events of all frequent event types in order, and their event types
+EVENT_TIMES = []
+EVENT_TYPES = []
+
+# Occurrences and sorted start times of each frequent 1-episode by event type
+ONE_EPISODES = {}
+ONE_EPISODE_STARTS = {}
+
+# How minimal occurrences are computed, with lists of occurrences or bitmaps of occurrence times
+ENGINES = ["auto", "list", "bitmap"]
+ENGINE = "list"
+
+# Bitmaps of the occurrence times of each frequent 1-episode by event type,
+# and tables of the next time each event type occurs at
+BITMAPS = {}
+NEXT_TIMES = {}
+
+# The bitmap engine is picked automatically for at most this many frequent event types,
+# which on average occur at least at this fraction of the times
+BITMAP_MAX_EVENT_TYPES = 26
+BITMAP_MIN_DENSITY = 0.02
+
+# Next time tables take 8 bytes per event type and time, so for longer event sequences
+# the bitmap engine searches the sorted times of the event types instead
+BITMAP_MAX_TABLE_BYTES = 16 * 2 ** 20
+
+# Start times of the windows which occurrences have to lie within, if any
+WINDOW_STARTS = None
+
+# Lowest minimum support which is derived from the length of an event sequence. Below it
+# almost every short episode is frequent and mining grows exponentially with the length.
+MIN_DERIVED_SUP = 5
+
 
-def manepi(event_sequence, min_sup, min_conf):
+def manepi(event_sequence, min_sup, min_conf, stats=None, occurrence_mode="keep", occurrence_directory=None, episode_mode="all", engine="auto", window_starts=None):
     """
     Performs the MANEPI+ algorithm on a given
     event sequence with a user defined minimum
@@ -26,31 +73,134 @@ def manepi(event_sequence, min_sup, min_conf):
         event_sequence: The event sequence to perform the algorithm on.
         min_sup: The minimum support threshold.
         min_conf: The minimum confidence threshold.
+        stats: Optional MiningStats object which counts candidates and pruning per depth.
+        occurrence_mode: What to do with the minimal occurrences of an episode once it has been grown,
+            "keep" them in memory, "discard" them, or "spill" them to a memory-mapped file so
+            they can still be read with FEPT.get_minimal_occurrences. Discarding or spilling
+            makes peak memory scale with the depth of the search rather than the number of
+            frequent episodes.
+        occurrence_directory: Directory for the spill file, defaults to the system temporary directory.
+        episode_mode: Which episodes to store, "all" frequent episodes, only "closed" ones (no
+            super-episode has the same support) or only "maximal" ones (no super-episode is frequent).
+            Rules are only generated towards stored episodes. Episodes containing an episode which
+            has a super-episode with the same minimal occurrences are neither, so they are not grown.
+        engine: How minimal occurrences are computed, joining "list"s of occurrences or with
+            shifts and masks on "bitmap"s of occurrence times, which is faster for few event
+            types which occur often. By default the engine is picked based on the event types.
+        window_starts: Optional sorted start times of windows which split the event sequence, e.g.
+            windows sampled from a longer one. Only occurrences within a single window are counted.
+            Supports are then computed from lists of occurrences, so the engine can not be "bitmap".
     """
 
+    if episode_mode not in EPISODE_MODES:
+        raise Exception(
+            f"Invalid episode mode, expected one of {EPISODE_MODES}")
+
+    if engine not in ENGINES:
+        raise Exception(f"Invalid engine, expected one of {ENGINES}")
+
+    if window_starts is not None and engine == "bitmap":
+        raise Exception("The bitmap engine can not keep occurrences within windows")
+
+    # Every episode would be frequent, so growing would never stop
+    if min_sup < 1:
+        raise Exception("Invalid minimum support, expected at least 1")
+
     # Create empty FEPT
-    global FEPT
+    global FEPT, STATS, EPISODE_MODE, ENGINE, WINDOW_STARTS
     FEPT = FrequentEpisodePrefixTree()
+    STATS = stats
+    EPISODE_MODE = episode_mode
+    WINDOW_STARTS = window_starts
+    COVERED.clear()
 
     # Set minimum support and confidence
     FEPT.set_min_conf(min_conf)
     FEPT.set_min_sup(min_sup)
+    FEPT.set_occurrence_mode(occurrence_mode, occurrence_directory)
 
     # Find all 1-episodes
     FEPT.set_frequent_one_episodes(find_frequent_one_episodes(event_sequence))
 
+    ONE_EPISODES.clear()
+    ONE_EPISODE_STARTS.clear()
+    BITMAPS.clear()
+    NEXT_TIMES.clear()
+    for event_type, occurrences in FEPT.frequent_one_episodes:
+        ONE_EPISODES[event_type] = occurrences
+        ONE_EPISODE_STARTS[event_type] = [occurrence[0]
+                                          for occurrence in occurrences]
+
+    if window_starts is not None:
+        ENGINE = "list"
+    else:
+        ENGINE = choose_engine(FEPT.frequent_one_episodes) if engine == "auto" else engine
+    if ENGINE == "bitmap":
+        for event_type, occurrences in FEPT.frequent_one_episodes:
+            BITMAPS[event_type] = to_bitmap(occurrences)
+
+        last_time = max((bitmap.bit_length() for bitmap in BITMAPS.values()), default=0)
+        if 8 * (last_time + 1) * len(BITMAPS) <= BITMAP_MAX_TABLE_BYTES:
+            for event_type, bitmap in BITMAPS.items():
+                NEXT_TIMES[event_type] = next_times(bitmap)
+
+    EVENT_TIMES.clear()
+    EVENT_TYPES.clear()
+    if EPISODE_MODE != "all":
+        for time, event_type in sorted((occurrence[0], event_type)
+                                       for event_type, occurrences in FEPT.frequent_one_episodes
+                                       for occurrence in occurrences):
+            EVENT_TIMES.append(time)
+            EVENT_TYPES.append(event_type)
+
     for event_type, occurrences in FEPT.frequent_one_episodes:
         # For simple 1-episodes, the support value is always just going to be the
         # length of the set of their occurrences
         node = FEPT.insert([event_type], occurrences, len(occurrences))
 
         # Grow the 1-episode
-        grow(node)
+        grow(node, occurrences[0][1])
+
+        # Its occurrences are still referenced by the frequent 1-episodes,
+        # so they are only released from the node itself
+        FEPT.release_occurrences(node)
+
+    # Unstore the episodes which are not closed or maximal, and drop the
+    # parts of the tree which were only needed for navigation while growing
+    if EPISODE_MODE != "all":
+        absorb_sub_episodes()
+        FEPT.prune_unstored()
+        COVERED.clear()
+        EVENT_TIMES.clear()
+        EVENT_TYPES.clear()
+
+    ONE_EPISODES.clear()
+    ONE_EPISODE_STARTS.clear()
+    BITMAPS.clear()
+    NEXT_TIMES.clear()
+
+    WINDOW_STARTS = None
 
     # All frequently occurring episodes have now been found
     return FEPT
 
 
+def derive_min_sup(min_sup_multiplier, length):
+    """
+    Derive a minimum support as a fraction of the length of an event sequence,
+    raising an exception rather than mining with a support which is too low
+    """
+
+    min_sup = int(min_sup_multiplier * length)
+
+    if min_sup < MIN_DERIVED_SUP:
+        raise Exception(
+            f"A minimum support of {min_sup_multiplier} * {length} events is {min_sup}, which is below {MIN_DERIVED_SUP} "
+            "so mining would not finish, please set a higher minimum support explicitly")
+
+    return min_sup
+
+
 def find_frequent_one_episodes(event_sequence):
     """
     Finds all the frequent 1-episodes in the event sequence.
@@ -66,57 +216,310 @@ def find_frequent_one_episodes(event_sequence):
             one_episodes[event.type] = [[event.time] * 2]
 
     # Filter out all the episodes that don't have support >= min_sup
-    return sorted(list(filter(lambda episode: len(episode[1]) >= FEPT.min_sup, one_episodes.items())))
+    frequent_one_episodes = sorted(list(filter(
+        lambda episode: len(episode[1]) >= FEPT.min_sup, one_episodes.items())))
+
+    if STATS is not None:
+        STATS.count(1, "candidates", len(one_episodes))
+        STATS.count(1, "support_pruned", len(
+            one_episodes) - len(frequent_one_episodes))
+        STATS.count(1, "frequent", len(frequent_one_episodes))
 
+    return frequent_one_episodes
 
-def grow(node):
+
+def choose_engine(frequent_one_episodes):
+    """
+    Picks the bitmap engine when there are few frequent event types,
+    each occurring at a large fraction of the times, and otherwise the
+    list engine. Bitmaps need non-negative integer times, with each
+    event type occurring at most once at each time.
+    """
+
+    if not frequent_one_episodes or len(frequent_one_episodes) > BITMAP_MAX_EVENT_TYPES:
+        return "list"
+
+    n_occurrences = 0
+    last_time = 0
+    for _, occurrences in frequent_one_episodes:
+        previous = -1
+        for occurrence in occurrences:
+            time = occurrence[0]
+            if not isinstance(time, int) or time <= previous:
+                return "list"
+            previous = time
+
+        n_occurrences += len(occurrences)
+        last_time = max(last_time, previous)
+
+    # Sparse bitmaps are mostly zero words which every operation still has to go through
+    if n_occurrences < BITMAP_MIN_DENSITY * len(frequent_one_episodes) * (last_time + 1):
+        return "list"
+
+    return "bitmap"
+
+
+def grow(node, first_end, node_ends=None):
     """
     Expands a given node, adding onto the tree
     all the frequent episodes with the given
-    node as a prefix.
+    node as a prefix. The end of the node's first
+    minimal occurrence is passed along, as only
+    occurrences which start after it can be
+    concatenated onto the node. With the bitmap
+    engine, so is the bitmap of all their ends.
     """
 
-    for event_type, occurrences in FEPT.frequent_one_episodes:
+    # The label is rebuilt from the node's parents, so it is only built once
+    prefix = node.label
+    depth = len(prefix) + 1
+    candidates = get_candidates(prefix)
+
+    if STATS is not None:
+        skipped = len(FEPT.frequent_one_episodes) - len(candidates)
+        STATS.count(depth, "candidates", skipped)
+        STATS.count(depth, "suffix_pruned", skipped)
+
+    # Whether the node still has to be checked for being covered
+    unchecked = EPISODE_MODE != "all" and len(prefix) > 1
+
+    for event_type, occurrences in candidates:
 
         # Concatenate the two episodes
-        label = node.label + [event_type]
+        label = prefix + [event_type]
+
+        if STATS is not None:
+            STATS.count(depth, "candidates")
+
+        if ENGINE == "bitmap":
+            # The minimal occurrences of the concatenation end at exactly the
+            # occurrences of the event type which start after the first end
+            ends = after(BITMAPS[event_type], first_end)
+            n_minimal_occurrences = popcount(ends)
+        else:
+            # Cheap upper bound on the number of minimal occurrences of the concatenation,
+            # which prunes most candidates when there are many event types
+            n_minimal_occurrences = len(occurrences) - bisect_right(
+                ONE_EPISODE_STARTS[event_type], first_end)
+
+        if n_minimal_occurrences < FEPT.min_sup:
+            if STATS is not None:
+                STATS.count(depth, "occurrence_pruned")
+            continue
 
         #MANEPI+ Optimisations
         continue_growth = True
         for i in range(1, len(label)):
             suffix = label[i:]
 
-            if suffix <= node.label and not FEPT.exists(suffix):
+            if suffix <= prefix and not FEPT.exists(suffix):
                 continue_growth = False
                 break
 
         if not continue_growth:
+            if STATS is not None:
+                STATS.count(depth, "suffix_pruned")
             continue
 
-        # Get the minimal occurrences of the concatenation of the two episodes
-        minimal_occurrences = concat_minimal_occurrences(
-            node.minimal_occurrences, occurrences)
+        if ENGINE == "bitmap":
+            support = bitmap_support(label, NEXT_TIMES) if NEXT_TIMES else search_support(
+                label, ONE_EPISODE_STARTS)
 
-        # If we have less minimal occurrences than the min_sup
-        # we will also have less minimal and non-overlapping
-        # occurrences than the min_sup, so we can skip
-        # this episode growth
-        if len(minimal_occurrences) < FEPT.min_sup:
-            continue
+            # The minimal occurrences are only built if they are kept after growing
+            minimal_occurrences = None
+            if FEPT.occurrence_mode != "discard" and support >= FEPT.min_sup:
+                minimal_occurrences = bitmap_minimal_occurrences(
+                    label, ends, BITMAPS)
+
+            new_first_end = lowest_bit(ends)
+        else:
+            # Get the minimal occurrences of the concatenation of the two episodes
+            minimal_occurrences = concat_minimal_occurrences(
+                node.minimal_occurrences, occurrences)
+
+            if WINDOW_STARTS is not None:
+                minimal_occurrences = within_windows(
+                    minimal_occurrences, WINDOW_STARTS)
+
+            # If we have less minimal occurrences than the min_sup
+            # we will also have less minimal and non-overlapping
+            # occurrences than the min_sup, so we can skip
+            # this episode growth
+            if len(minimal_occurrences) < FEPT.min_sup:
+                if STATS is not None:
+                    STATS.count(depth, "occurrence_pruned")
+                continue
+
+            support = calculate_support(minimal_occurrences)
+            new_first_end = minimal_occurrences[0][1]
 
         # Check if the episode is considered frequent (support >= min_sup)
-        if (support := calculate_support(minimal_occurrences)) >= FEPT.min_sup:
+        if support >= FEPT.min_sup:
+            # Only nodes which have frequent children are checked, as
+            # the closed or maximal ones among the rest are found anyway
+            if unchecked:
+                unchecked = False
+                if is_covered(prefix, set_times(node_ends) if ENGINE == "bitmap" else (
+                        occurrence[1] for occurrence in node.minimal_occurrences)):
+                    # Neither the node nor any episode grown from it can be closed or maximal
+                    if STATS is not None:
+                        STATS.count(depth - 1, "covered")
+
+                    COVERED.add(node)
+                    FEPT.unstore(node)
+                    return
+
+            if STATS is not None:
+                STATS.count(depth, "frequent")
 
             # If it is, create a new FEPT node and add it as a child of the current node
             new_node = FEPT.insert(label, minimal_occurrences, support)
 
             # Perform further episode growth
-            grow(new_node)
+            grow(new_node, new_first_end, ends if ENGINE == "bitmap" else None)
+
+            # The node is fully grown, its occurrences are no longer needed
+            FEPT.release_occurrences(new_node)
+
+        elif STATS is not None:
+            STATS.count(depth, "support_pruned")
 
     # This node has been grown to its full extent
     return
 
 
+def get_candidates(prefix):
+    """
+    Get the frequent 1-episodes which may be appended to a prefix.
+    Every suffix of a frequent episode is frequent, so once the
+    1-episode of the prefix's last event has been fully grown, only
+    its children can follow that event. With many event types, such
+    as when mining several tickers at once, this is usually a small
+    fraction of all the frequent 1-episodes.
+    """
+
+    last_event_type = prefix[-1]
+    if len(prefix) < 2 or last_event_type >= prefix[0]:
+        return FEPT.frequent_one_episodes
+
+    followers = FEPT.root.children[last_event_type].children
+    return [(event_type, ONE_EPISODES[event_type]) for event_type in followers]
+
+
+def is_covered(label, end_times):
+    """
+    Checks whether an episode contains a covered episode, one with an event
+    which can be inserted between two of its events without changing any of
+    its minimal occurrences. Concatenations only depend on the minimal
+    occurrences, so the same holds for every episode containing the covered
+    one, which then has a super-episode with the same support: none of them
+    are closed or maximal. The episode's suffixes are checked through the
+    FEPT, and the episode itself by matching it backwards from the end of
+    each minimal occurrence at the latest times, as its start does. The
+    event must lie between the same two matched events in every one of them.
+    """
+
+    suffix_node = FEPT.find(label[1:])
+    if suffix_node is not None and suffix_node in COVERED:
+        return True
+
+    starts = [ONE_EPISODE_STARTS[event_type] for event_type in label]
+    times = [None] * len(label)
+
+    candidates = None
+    lowest_gap = 0
+    for end in end_times:
+        # Ends usually share their earlier matched events, so matching stops at the first
+        # unchanged one, and never goes below the lowest gap which still has a candidate
+        times[-1] = end
+        i = len(label) - 2
+        while i >= lowest_gap:
+            event_starts = starts[i]
+            time = event_starts[bisect_left(event_starts, times[i + 1]) - 1]
+            if time == times[i]:
+                break
+
+            times[i] = time
+            i -= 1
+
+        if candidates is None:
+            # Every event between two matched events of the first minimal occurrence
+            candidates = []
+            for gap in range(len(label) - 1):
+                event_types = {EVENT_TYPES[j] for j in range(bisect_right(EVENT_TIMES, times[gap]),
+                                                             bisect_left(EVENT_TIMES, times[gap + 1]))}
+                candidates.extend((gap, ONE_EPISODE_STARTS[event_type]) for event_type in event_types)
+        else:
+            candidates = [(gap, event_starts) for gap, event_starts in candidates
+                          if gap < i or occurs_between(event_starts, times[gap], times[gap + 1])]
+
+        if not candidates:
+            return False
+
+        lowest_gap = candidates[0][0]
+
+    return True
+
+
+def occurs_between(starts, first, last):
+    """
+    Checks whether any of the sorted start times lies strictly between two times
+    """
+
+    i = bisect_right(starts, first)
+    return i < len(starts) and starts[i] < last
+
+
+def absorb_sub_episodes():
+    """
+    Unstores every episode which has a super-episode in the FEPT with the
+    same support, or when only mining maximal episodes any super-episode.
+    Each episode looks at the episodes obtained by removing a single event
+    from it, which absorb the episodes below them in turn. Episodes which
+    were not grown because they contain a covered episode are not in the
+    FEPT, so the episodes below them are looked up directly, as long as
+    they are not also below an episode which is.
+    """
+
+    nodes = [(child, [event_type]) for event_type, child in FEPT.root.children.items()]
+    while nodes:
+        node, label = nodes.pop()
+        nodes.extend((child, label + [event_type]) for event_type, child in node.children.items())
+
+        missing = []
+        for i in range(len(label) if len(label) > 1 else 0):
+            sub_node = FEPT.find(label[:i] + label[i + 1:])
+            if sub_node is None:
+                missing.append(i)
+            else:
+                absorb(sub_node, node.support)
+
+        # Remove more events which each lead to a missing episode on their own
+        removals = [(i,) for i in missing]
+        while removals:
+            removed = removals.pop()
+            for i in missing:
+                if i <= removed[-1]:
+                    continue
+
+                sub_label = [event_type for j, event_type in enumerate(label)
+                             if j != i and j not in removed]
+                sub_node = FEPT.find(sub_label)
+                if sub_node is None:
+                    removals.append(removed + (i,))
+                else:
+                    absorb(sub_node, node.support)
+
+
+def absorb(node, support):
+    """
+    Unstores an episode which has a super-episode with a given support
+    """
+
+    if EPISODE_MODE == "maximal" or support >= node.support:
+        FEPT.unstore(node)
+
+
 def concat_minimal_occurrences(prefix_minimal_occurrences, occurrences):
     """
     Computes the minimal occurences for a concatenation of episodes
@@ -126,18 +529,32 @@ def concat_minimal_occurrences(prefix_minimal_occurrences, occurrences):
     concat_minimal_occurrences = []
     i = 0
 
+    # Both occurrence lists are sorted, so the last prefix occurrence ending
+    # before each occurrence is found by only ever moving forwards through them
     prefix_minimal_occurrences_length = len(prefix_minimal_occurrences)
     for occurrence in occurrences:
-        for j in range(i, prefix_minimal_occurrences_length):
-            if prefix_minimal_occurrences[j][1] < occurrence[0] and (j == prefix_minimal_occurrences_length - 1 or (j != prefix_minimal_occurrences_length - 1 and prefix_minimal_occurrences[j + 1][1] >= occurrence[0])):
-                concat_minimal_occurrences.append(
-                    [prefix_minimal_occurrences[j][0], occurrence[0]])
-                i = j
-                break
+        while i < prefix_minimal_occurrences_length and prefix_minimal_occurrences[i][1] < occurrence[0]:
+            i += 1
+
+        if i:
+            concat_minimal_occurrences.append(
+                [prefix_minimal_occurrences[i - 1][0], occurrence[0]])
 
     return concat_minimal_occurrences
 
 
+def within_windows(minimal_occurrences, window_starts):
+    """
+    Keeps the minimal occurrences which start and end in the same window.
+    A minimal occurrence has the latest start of all occurrences ending
+    at its end, so if it crosses into another window, every occurrence
+    ending there does.
+    """
+
+    return [occurrence for occurrence in minimal_occurrences
+            if bisect_right(window_starts, occurrence[0]) == bisect_right(window_starts, occurrence[1])]
+
+
 def calculate_support(minimal_occurrences):
     """
     Computes the cardinality of the first
@@ -0,0 +1,307 @@
+"""
+Rolling MANEPI+ which keeps the frequent episodes of a sliding window
+over an event sequence up to date, one event at a time, instead of
+mining every window from scratch.
+"""
+
+from collections import deque, defaultdict
+from algorithms.manepi import concat_minimal_occurrences
+from structures import FrequentEpisodePrefixTree, FrequentEpisodePrefixTreeNode
+from structures.fept import NO_CHILDREN
+
+
+class RollingMiner:
+    """
+    Keeps a FEPT with the frequent episodes of the most recent events.
+
+    Next to the frequent episodes it tracks the border, the infrequent
+    episodes which extend a frequent episode by a frequent event type,
+    as these are the only episodes which can become frequent when an
+    event arrives. The minimal occurrences of an episode within the
+    window are its minimal occurrences within the whole event sequence
+    which start inside the window, so:
+
+        - When an event leaves the window, only the episodes starting
+          with its event type lose occurrences, from their front.
+        - When an event arrives, only the episodes ending with its event
+          type gain an occurrence, at their back.
+
+    Only the supports of these episodes are recalculated, so the cost of
+    a step is proportional to the occurrences of the affected episodes.
+    """
+
+    def __init__(self, window_length, min_sup, min_conf):
+        """
+        Constructor, starts with an empty window
+
+        args:
+            window_length: The number of events in the window.
+            min_sup: The minimum support threshold within the window.
+            min_conf: The minimum confidence threshold.
+        """
+
+        self.window_length = window_length
+        self.min_sup = min_sup
+        self.window = deque()
+
+        self.FEPT = FrequentEpisodePrefixTree()
+        self.FEPT.set_min_sup(min_sup)
+        self.FEPT.set_min_conf(min_conf)
+        self.FEPT.set_frequent_one_episodes([])
+
+        # Occurrences of each event type within the window
+        self.occurrences = {}
+
+        # Border episodes of each frequent episode by their last event type
+        self.border = {self.FEPT.root: {}}
+
+        # Frequent and border episodes by their first and last event types
+        self.starting = defaultdict(set)
+        self.ending = defaultdict(set)
+
+        # First event type and end of the last non-overlapping occurrence of each episode
+        self.first_types = {}
+        self.last_ends = {}
+
+    def push(self, event):
+        """
+        Slide the window over a new event, returning the updated FEPT
+        """
+
+        self.window.append(event)
+        if len(self.window) > self.window_length:
+            self.expire(self.window.popleft())
+
+        self.arrive(event)
+
+        return self.FEPT
+
+    def arrive(self, event):
+        """
+        Extend the occurrences of the episodes ending with
+        the event type of an event entering the window
+        """
+
+        root = self.FEPT.root
+
+        occurrences = self.occurrences.get(event.type)
+        if occurrences is None:
+            occurrences = self.occurrences[event.type] = []
+            self.add_candidate(root, event.type)
+
+        occurrences.append([event.time, event.time])
+
+        promoted = []
+        for node in list(self.ending[event.type]):
+            if node.parent is root:
+                node.support = len(occurrences)
+                self.last_ends[node] = event.time
+            else:
+                # The new occurrence starts at the last occurrence of the prefix ending before the event
+                prefix_minimal_occurrences = node.parent.minimal_occurrences
+                i = len(prefix_minimal_occurrences) - 1
+                while i >= 0 and prefix_minimal_occurrences[i][1] >= event.time:
+                    i -= 1
+
+                if i < 0:
+                    continue
+
+                # Non-overlapping occurrences are picked greedily from the front,
+                # so the new occurrence is picked if it starts after the last one
+                start = prefix_minimal_occurrences[i][0]
+                node.minimal_occurrences.append([start, event.time])
+                if not node.support or start > self.last_ends[node]:
+                    node.support += 1
+                    self.last_ends[node] = event.time
+
+            if not node.stored and node.support >= self.min_sup:
+                promoted.append(node)
+
+        for node in promoted:
+            self.promote(node)
+
+    def expire(self, event):
+        """
+        Drop the occurrences of the episodes starting with
+        the event type of an event leaving the window
+        """
+
+        root = self.FEPT.root
+
+        occurrences = self.occurrences[event.type]
+        del occurrences[0]
+
+        demoted = []
+        for node in list(self.starting[event.type]):
+            if node.parent is root:
+                node.support = len(occurrences)
+            else:
+                minimal_occurrences = node.minimal_occurrences
+                n_expired = 0
+                while n_expired < len(minimal_occurrences) and minimal_occurrences[n_expired][0] == event.time:
+                    n_expired += 1
+
+                if not n_expired:
+                    continue
+
+                del minimal_occurrences[:n_expired]
+                self.calculate_support(node)
+
+            if node.stored and node.support < self.min_sup:
+                demoted.append(node)
+
+        # Shorter episodes are demoted first, as their super-episodes are removed with them
+        demoted.sort(key=lambda node: len(node.label))
+
+        removed = set()
+        for node in demoted:
+            if node not in removed:
+                removed.update(self.demote(node))
+
+        if not occurrences:
+            del self.occurrences[event.type]
+            self.remove_candidate(self.border[root][event.type])
+
+    def add_candidate(self, prefix, event_type):
+        """
+        Add the episode extending a frequent episode by an event type
+        to the border, promoting it straight away if it is frequent
+        """
+
+        if prefix is self.FEPT.root:
+            minimal_occurrences = self.occurrences[event_type]
+        else:
+            minimal_occurrences = concat_minimal_occurrences(
+                prefix.minimal_occurrences, self.occurrences[event_type])
+
+        candidate = FrequentEpisodePrefixTreeNode(
+            event_type, prefix, minimal_occurrences, 0)
+        candidate.stored = False
+        self.first_types[candidate] = event_type if prefix is self.FEPT.root else self.first_types[prefix]
+        self.calculate_support(candidate)
+
+        self.border[prefix][event_type] = candidate
+        self.index(candidate)
+
+        if candidate.support >= self.min_sup:
+            self.promote(candidate)
+
+    def calculate_support(self, node):
+        """
+        Computes the support of an episode like calculate_support, remembering
+        the end of the last occurrence picked for extending it later
+        """
+
+        node.support = 0
+        last_end = None
+        for start, end in node.minimal_occurrences:
+            if last_end is None or start > last_end:
+                node.support += 1
+                last_end = end
+
+        self.last_ends[node] = last_end
+
+    def remove_candidate(self, candidate):
+        """
+        Remove an episode from the border
+        """
+
+        del self.border[candidate.parent][candidate.symbol]
+        self.unindex(candidate)
+        self.forget(candidate)
+
+    def promote(self, candidate):
+        """
+        Move an episode which has become frequent from the border into the FEPT
+        """
+
+        root = self.FEPT.root
+
+        first_type = self.first_types[candidate]
+        last_end = self.last_ends[candidate]
+
+        self.remove_candidate(candidate)
+        node = self.FEPT.insert(
+            candidate.label, candidate.minimal_occurrences, candidate.support)
+        self.first_types[node] = first_type
+        self.last_ends[node] = last_end
+        self.border[node] = {}
+        self.index(node)
+
+        # A new frequent event type can extend every frequent episode
+        if node.parent is root:
+            nodes = list(root.children.values())
+            for prefix in nodes:
+                nodes.extend(prefix.children.values())
+                if prefix is not node:
+                    self.add_candidate(prefix, node.symbol)
+
+            self.update_frequent_one_episodes()
+
+        for event_type in list(root.children):
+            if event_type not in node.children and event_type not in self.border[node]:
+                self.add_candidate(node, event_type)
+
+    def demote(self, node):
+        """
+        Move an episode which is no longer frequent from the FEPT back to the
+        border, removing its super-episodes, and return the removed nodes
+        """
+
+        root = self.FEPT.root
+
+        removed = self.FEPT.remove(node)
+        for descendant in removed:
+            for candidate in self.border.pop(descendant).values():
+                self.unindex(candidate)
+                self.forget(candidate)
+
+            self.unindex(descendant)
+            if descendant is not node:
+                self.forget(descendant)
+
+        # Episodes ending with an infrequent event type can not be frequent
+        if node.parent is root:
+            for candidate in list(self.ending[node.symbol]):
+                self.remove_candidate(candidate)
+
+            self.update_frequent_one_episodes()
+
+        node.stored = False
+        node.children = NO_CHILDREN
+        self.border[node.parent][node.symbol] = node
+        self.index(node)
+
+        return removed
+
+    def index(self, node):
+        """
+        Index an episode by its first and last event types
+        """
+
+        self.starting[self.first_types[node]].add(node)
+        self.ending[node.symbol].add(node)
+
+    def unindex(self, node):
+        """
+        Remove an episode from the indexes of its first and last event types
+        """
+
+        self.starting[self.first_types[node]].discard(node)
+        self.ending[node.symbol].discard(node)
+
+    def forget(self, node):
+        """
+        Drop what is remembered about an episode which has been removed
+        """
+
+        del self.first_types[node]
+        del self.last_ends[node]
+
+    def update_frequent_one_episodes(self):
+        """
+        Store the frequent 1-episodes of the window in the FEPT
+        """
+
+        self.FEPT.set_frequent_one_episodes(
+            sorted((event_type, self.occurrences[event_type]) for event_type in self.FEPT.root.children))
@@ -6,7 +6,7 @@
 
 # Implementation adapted from https://jmotif.github.io/sax-vsm_site/morea/algorithm/SAX.html
 
-import random
+from itertools import accumulate
 from string import ascii_uppercase, ascii_lowercase
 from statistics import fmean as mean
 from statistics import stdev, NormalDist
@@ -45,6 +45,50 @@ def paa_transform(data, paa_size):
     return [i / length for i in paa]
 
 
+def cumulative_sums(data):
+    """ Compute the prefix sums of the data, with sums[i] being the sum of the first i values """
+
+    return list(accumulate(data, initial=0.0))
+
+
+def paa_from_cumulative_sums(sums, paa_size):
+    """
+    Perform the piecewise aggregate approximation using the prefix sums of the data,
+    giving the same segments as paa_transform in O(paa_size) time
+    """
+
+    length = len(sums) - 1
+    # Edge cases
+    if paa_size >= length:
+        return [sums[i + 1] - sums[i] for i in range(length)]
+    if paa_size == 1:
+        return [sums[length] / length]
+    # If data can be divided into equal parts, the mean of each segment is a difference of sums
+    if length % paa_size == 0:
+        segment_size = length // paa_size
+        return [(sums[(i + 1) * segment_size] - sums[i * segment_size]) / segment_size for i in range(paa_size)]
+
+    # Otherwise, each value is repeated paa_size times and split into paa_size segments of
+    # length values, so a segment boundary t falls part way through value t // paa_size
+    def expanded_sum(t):
+        index, remainder = divmod(t, paa_size)
+        if not remainder:
+            return paa_size * sums[index]
+        return paa_size * sums[index] + remainder * (sums[index + 1] - sums[index])
+
+    return [(expanded_sum((i + 1) * length) - expanded_sum(i * length)) / length for i in range(paa_size)]
+
+
+def aggregate_paa(paa, paa_size):
+    """
+    Build a coarser PAA from a finer one whose size is a multiple of paa_size
+    by averaging groups of neighbouring segments
+    """
+
+    group_size = len(paa) // paa_size
+    return [mean(paa[i * group_size:(i + 1) * group_size]) for i in range(paa_size)]
+
+
 def paa_to_string(paa, regions, alphabet):
     """ Maps each value in the paa to a region and returns the character string representation """
 
@@ -62,23 +106,156 @@ def paa_to_string(paa, regions, alphabet):
     return string
 
 
+def get_regions(alphabet_size):
+    """ Generate character regions using inverse cumulative density function """
+
+    return [NormalDist().inv_cdf((i * 1) / alphabet_size)
+            for i in range(1, alphabet_size)]
+
+
 def sax_transform(paa, alphabet_size):
     """ Generate character regions using inverse cumulative density function then return string representation """
 
-    regions = [NormalDist().inv_cdf((i * 1) / alphabet_size)
-               for i in range(1, alphabet_size)]
-    return paa_to_string(paa, regions, get_alphabet(alphabet_size))
+    return paa_to_string(paa, get_regions(alphabet_size), get_alphabet(alphabet_size))
 
 
-def sax(data, word_length, alphabet_size):
+def sax(data, word_length, alphabet_size, profiler=None):
     """ 
     Perform the symbolic aggregate approximation on a piece of data
     args:
         data: The data to transform
         word_length: The length of the output string
         alphabet_size: The length of the alphabet you want to use, for example, for an alphabet {A, B, C}, alphabet_size = 3
+        profiler: Optional Profiler used to time each step of the transformation
     """
-    return sax_transform(paa_transform(z_normalize(data), word_length), alphabet_size)
+
+    if profiler is None:
+        return sax_transform(paa_transform(z_normalize(data), word_length), alphabet_size)
+
+    with profiler.stage("z_normalize"):
+        normalized = z_normalize(data)
+
+    with profiler.stage("paa_transform"):
+        paa = paa_transform(normalized, word_length)
+
+    with profiler.stage("sax_transform"):
+        return sax_transform(paa, alphabet_size)
+
+
+def sax_pyramid(data, word_lengths, alphabet_size, profiler=None):
+    """
+    Perform the symbolic aggregate approximation for several word lengths at once.
+    The data is normalized and summed in a single pass, then each PAA level is either
+    averaged down from an already computed finer level or read off the prefix sums.
+    args:
+        data: The data to transform
+        word_lengths: The lengths of the output strings
+        alphabet_size: The length of the alphabet you want to use
+        profiler: Optional Profiler used to time each step of the transformation
+    returns:
+        A dictionary mapping each word length to its string representation
+    """
+
+    if profiler is None:
+        from contextlib import nullcontext
+        def stage(_): return nullcontext()
+    else:
+        stage = profiler.stage
+
+    with stage("z_normalize"):
+        normalized = z_normalize(data)
+
+    with stage("cumulative_sums"):
+        sums = cumulative_sums(normalized)
+
+    with stage("paa_pyramid"):
+        levels = paa_pyramid(normalized, sums, word_lengths)
+
+    with stage("sax_transform"):
+        regions = get_regions(alphabet_size)
+        alphabet = get_alphabet(alphabet_size)
+        return {word_length: paa_to_string(levels[word_length], regions, alphabet) for word_length in word_lengths}
+
+
+def paa_pyramid(normalized, sums, word_lengths):
+    """
+    Compute the PAA of normalized data for several word lengths, computing the finest
+    levels first so coarser levels can be averaged down from them, otherwise reading
+    them off the prefix sums of the data
+    """
+
+    length = len(normalized)
+
+    levels = {}
+    for word_length in sorted(set(word_lengths), reverse=True):
+        finer = next((paa_size for paa_size in levels if paa_size < length
+                      and paa_size % word_length == 0), None)
+
+        if finer and word_length < length:
+            levels[word_length] = aggregate_paa(levels[finer], word_length)
+        else:
+            levels[word_length] = paa_from_cumulative_sums(sums, word_length)
+
+    return levels
+
+
+def paa_to_strings(paa, alphabet_sizes):
+    """
+    Map a paa to its string representation for several alphabet sizes, sorting
+    the paa once so each alphabet size only needs a single sweep over its regions
+    """
+
+    order = sorted(range(len(paa)), key=paa.__getitem__)
+
+    strings = {}
+    for alphabet_size in alphabet_sizes:
+        regions = get_regions(alphabet_size)
+        alphabet = get_alphabet(alphabet_size)
+
+        string = [None] * len(paa)
+        index = 0
+        for i in order:
+            while index < len(regions) and paa[i] > regions[index]:
+                index += 1
+            string[i] = alphabet[index]
+
+        strings[alphabet_size] = string
+
+    return strings
+
+
+def sax_grid(data, word_lengths, alphabet_sizes, profiler=None):
+    """
+    Perform the symbolic aggregate approximation for every combination of word length
+    and alphabet size. The data is normalized and summed once, each PAA level is
+    computed once as in sax_pyramid, and each level is sorted once for all alphabet sizes.
+    args:
+        data: The data to transform
+        word_lengths: The lengths of the output strings
+        alphabet_sizes: The lengths of the alphabets to use
+        profiler: Optional Profiler used to time each step of the transformation
+    returns:
+        A dictionary mapping each (word length, alphabet size) pair to its string representation
+    """
+
+    if profiler is None:
+        from contextlib import nullcontext
+        def stage(_): return nullcontext()
+    else:
+        stage = profiler.stage
+
+    with stage("z_normalize"):
+        normalized = z_normalize(data)
+
+    with stage("cumulative_sums"):
+        sums = cumulative_sums(normalized)
+
+    with stage("paa_pyramid"):
+        levels = paa_pyramid(normalized, sums, word_lengths)
+
+    with stage("sax_transform"):
+        return {(word_length, alphabet_size): string for word_length, paa in levels.items()
+                for alphabet_size, string in paa_to_strings(paa, alphabet_sizes).items()}
 
 
 def get_alphabet(alphabet_size):
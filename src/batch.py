@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+"""
+This script mines a list of stock tickers one after another as a pipeline, fetching and writing
+the results of some tickers while others are being mined
+"""
+
+import sys
+import os.path
+from functools import partial
+from algorithms import manepi, derive_min_sup
+from structures.fept import write_results
+from utils import ensure_stock_data, get_time_series, convert_to_event_sequences
+from utils.pipeline import Stage, Pipeline
+
+VALID_ARGS = ["-w", "--word-length", "-a", "--alphabet-size",
+              "-s", "--min-sup", "-c", "--min-conf", "-h", "--help",
+              "-j", "--jobs", "-q", "--queue-size", "--offline", "-i", "--interval",
+              "-e", "--episodes", "--engine"]
+
+
+def print_help():
+    print(
+        """
+    Tool to mine each of a list of stock tickers separately, overlapping fetching, mining and writing results.
+
+    USAGE:
+        python src/batch.py <TICKER>,<TICKER>,... <OPTIONS>
+        python src/batch.py -h or python batch.py --help
+
+    OPTIONS:
+        -h or --help: Displays this message.
+        -w or --word-length: Set the word length parameter for the SAX algorithm - Range: (0 1]. (Default: 0.8 * Length of data)
+        -a or --alphabet-size: Set the alphabet size parameter for the SAX algorithm. (Default: 26)
+        -s or --min-sup: Set the minimum support value for MANEPI - Range: (0 1], as a fraction of the length of the event sequence, which has to give at least 5. (Default: 0.01)
+        -c or --min-conf: Set the minimum confidence value for MANEPI. (Default: 0.75)
+        -i or --interval: Mine intraday bars of the given size instead of daily bars: 1min, 5min, 15min, 30min or 60min.
+        -j or --jobs: Number of processes performing SAX and mining at the same time, each. (Default: number of CPUs)
+        -q or --queue-size: Number of tickers which may wait between two stages. (Default: 2)
+        -e or --episodes: Which frequent episodes to output: all, closed or maximal. (Default: all)
+        --engine: How minimal occurrences are computed: list, bitmap or auto. (Default: auto)
+        --offline: Never fetch data, only use data that has previously been fetched for the tickers.
+
+    The results of each ticker are written to results/<TICKER>, or results/<TICKER>/<INTERVAL> for intraday bars,
+    and the time each stage was busy is printed at the end. Tickers which fail to fetch, parse or mine are reported
+    at the end without stopping the others.
+    """
+    )
+    return
+
+
+def fetch(interval, offline, ticker):
+    """
+    Download the data of a ticker unless it has been fetched before
+    """
+
+    ensure_stock_data(ticker, interval, offline)
+
+    return ticker
+
+
+def parse(interval, ticker):
+    """
+    Read the time series of a ticker from its csv file
+    """
+
+    return ticker, get_time_series(ticker, None, interval)
+
+
+def convert(word_length_multiplier, alphabet_size, item):
+    """
+    Convert the time series of a ticker into an event sequence, run in a separate process
+    """
+
+    ticker, time_series = item
+
+    word_length = int(word_length_multiplier * len(time_series))
+    return ticker, convert_to_event_sequences(time_series, [word_length], alphabet_size)[word_length]
+
+
+def mine(min_sup_multiplier, min_conf, episode_mode, engine, item):
+    """
+    Mine the event sequence of a ticker and format its results, run in a separate
+    process. Only the formatted lines are sent back rather than the whole FEPT.
+    """
+
+    ticker, event_sequence = item
+
+    min_sup = derive_min_sup(min_sup_multiplier, len(event_sequence))
+    FEPT = manepi(event_sequence, min_sup, min_conf,
+                  occurrence_mode="discard", episode_mode=episode_mode, engine=engine)
+
+    with FEPT:
+        return ticker, FEPT.format_results(), FEPT.n_frequent_episodes, FEPT.n_frequent_episode_rules, min_sup
+
+
+def write(interval, item):
+    """
+    Write the results of a ticker to its results directory
+    """
+
+    ticker, (episode_lines, rule_lines), n_episodes, n_rules, min_sup = item
+
+    # Intraday results are kept apart from daily results
+    directory = f"results/{ticker}/{interval}" if interval else f"results/{ticker}"
+    os.makedirs(directory, exist_ok=True)
+
+    write_results(directory, episode_lines, rule_lines)
+
+    return f"${ticker}: Found {n_episodes} frequently occurring episodes and {n_rules} frequent episode rules with min_sup = {min_sup}"
+
+
+if __name__ == "__main__":
+
+    # Defaults
+    alphabet_size = 26
+    min_conf = 0.75
+    min_sup_multiplier = 0.01
+    word_length_multiplier = 0.8
+    jobs = os.cpu_count()
+    queue_size = 2
+
+    offline = False
+    interval = None
+    episode_mode = "all"
+    engine = "auto"
+
+    # Handle options
+    if len(sys.argv) < 2 or "-h" in sys.argv or "--help" in sys.argv:
+        print_help()
+        sys.exit(0)
+
+    if sys.argv[1] in VALID_ARGS:
+        raise Exception("Please provide a list of tickers")
+
+    tickers = sys.argv[1].split(",")
+
+    args = sys.argv[1:]
+
+    if "-w" in args or "--word-length" in args:
+        try:
+            word_length_multiplier = float(args[args.index("-w") + 1])
+        except:
+            word_length_multiplier = float(args[args.index("--word-length") + 1])
+
+    if "-a" in args or "--alphabet-size" in args:
+        try:
+            alphabet_size = int(args[args.index("-a") + 1])
+        except:
+            alphabet_size = int(args[args.index("--alphabet-size") + 1])
+
+    if "-s" in args or "--min-sup" in args:
+        try:
+            min_sup_multiplier = float(args[args.index("-s") + 1])
+        except:
+            min_sup_multiplier = float(args[args.index("--min-sup") + 1])
+
+    if "-c" in args or "--min-conf" in args:
+        try:
+            min_conf = float(args[args.index("-c") + 1])
+        except:
+            min_conf = float(args[args.index("--min-conf") + 1])
+
+    if "-j" in args or "--jobs" in args:
+        try:
+            jobs = int(args[args.index("-j") + 1])
+        except:
+            jobs = int(args[args.index("--jobs") + 1])
+
+    if "-q" in args or "--queue-size" in args:
+        try:
+            queue_size = int(args[args.index("-q") + 1])
+        except:
+            queue_size = int(args[args.index("--queue-size") + 1])
+
+    if "--offline" in args:
+        offline = True
+
+    if "-i" in args or "--interval" in args:
+        try:
+            interval = args[args.index("-i") + 1]
+        except:
+            interval = args[args.index("--interval") + 1]
+
+    if "-e" in args or "--episodes" in args:
+        try:
+            episode_mode = args[args.index("-e") + 1]
+        except:
+            episode_mode = args[args.index("--episodes") + 1]
+
+    if "--engine" in args:
+        engine = args[args.index("--engine") + 1]
+
+    # Fetching, parsing and writing wait on the network and disk, while SAX and mining compute
+    pipeline = Pipeline([
+        Stage("fetch", partial(fetch, interval, offline)),
+        Stage("parse", partial(parse, interval)),
+        Stage("sax", partial(convert, word_length_multiplier,
+              alphabet_size), kind="cpu", workers=jobs),
+        Stage("manepi", partial(mine, min_sup_multiplier, min_conf,
+              episode_mode, engine), kind="cpu", workers=jobs),
+        Stage("output", partial(write, interval))
+    ], queue_size)
+
+    print(f"[!] Mining {len(tickers)} tickers...")
+    for line in pipeline.run(tickers):
+        print(line)
+
+    # A ticker which fails does not stop the others, its error is reported once all are done
+    for ticker, stage, error in pipeline.failures:
+        print(f"${ticker}: Failed at {stage}: {error}")
+
+    print()
+    print(pipeline.summary())
+
+    if pipeline.failures:
+        sys.exit(1)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+"""
+This script load tests a running mining service (see serve.py), measuring the latency and throughput
+of mining and rule queries
+"""
+
+import sys
+import os.path
+import json
+import random
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+VALID_ARGS = ["-p", "--port", "-n", "--requests", "-c", "--concurrency",
+              "-s", "--min-sups", "-a", "--alphabet-size", "--cold", "-h", "--help"]
+
+
+def print_help():
+    print(
+        """
+    Tool to measure the latency and throughput of a mining service started with serve.py.
+
+    USAGE:
+        python src/loadtest.py <TICKER>,<TICKER>,... <OPTIONS>
+        python src/loadtest.py -h or python loadtest.py --help
+
+    OPTIONS:
+        -h or --help: Displays this message.
+        -p or --port: Port the service listens on at 127.0.0.1. (Default: 8000)
+        -n or --requests: Number of requests to send. (Default: 1000)
+        -c or --concurrency: Number of requests in flight at the same time. (Default: 8)
+        -s or --min-sups: Comma separated minimum supports to query, each one is mined once per ticker. (Default: 0, the default of the service)
+        -a or --alphabet-size: Alphabet size to query. (Default: 26)
+        --cold: Also time mining the first ticker with a fresh mine.py process, for comparison.
+
+    Half of the requests are /mine queries and half are /rules queries, for random tickers and minimum supports.
+    """
+    )
+    return
+
+
+def percentile(latencies, fraction):
+    """
+    Get the latency below which the given fraction of the sorted latencies lie
+    """
+
+    return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+
+def request(port, endpoint, parameters):
+    """
+    Send a request to the service, returning its latency and whether it succeeded
+    """
+
+    t1 = perf_counter()
+    try:
+        with urlopen(f"http://127.0.0.1:{port}/{endpoint}?{urlencode(parameters)}") as response:
+            body = json.load(response)
+    except HTTPError as error:
+        # Failed queries are answered with a status of 400 or 404 and a JSON error
+        with error:
+            body = json.load(error)
+    t2 = perf_counter()
+
+    return t2 - t1, "error" not in body
+
+
+if __name__ == "__main__":
+
+    # Defaults
+    port = 8000
+    n_requests = 1000
+    concurrency = 8
+    min_sups = [0]
+    alphabet_size = 26
+    cold = False
+
+    # Handle options
+    if len(sys.argv) < 2 or "-h" in sys.argv or "--help" in sys.argv:
+        print_help()
+        sys.exit(0)
+
+    if sys.argv[1] in VALID_ARGS:
+        raise Exception("Please provide a list of tickers")
+
+    tickers = sys.argv[1].split(",")
+
+    args = sys.argv[1:]
+
+    if "-p" in args or "--port" in args:
+        try:
+            port = int(args[args.index("-p") + 1])
+        except:
+            port = int(args[args.index("--port") + 1])
+
+    if "-n" in args or "--requests" in args:
+        try:
+            n_requests = int(args[args.index("-n") + 1])
+        except:
+            n_requests = int(args[args.index("--requests") + 1])
+
+    if "-c" in args or "--concurrency" in args:
+        try:
+            concurrency = int(args[args.index("-c") + 1])
+        except:
+            concurrency = int(args[args.index("--concurrency") + 1])
+
+    if "-s" in args or "--min-sups" in args:
+        try:
+            min_sups = [int(min_sup) for min_sup in args[args.index(
+                "-s") + 1].split(",")]
+        except:
+            min_sups = [int(min_sup) for min_sup in args[args.index(
+                "--min-sups") + 1].split(",")]
+
+    if "-a" in args or "--alphabet-size" in args:
+        try:
+            alphabet_size = int(args[args.index("-a") + 1])
+        except:
+            alphabet_size = int(args[args.index("--alphabet-size") + 1])
+
+    if "--cold" in args:
+        cold = True
+
+    # Build a random mix of queries, the first query of each combination has to be mined
+    rng = random.Random(0)
+    queries = []
+    for _ in range(n_requests):
+        parameters = {"ticker": rng.choice(tickers), "alphabet_size": alphabet_size}
+        if min_sup := rng.choice(min_sups):
+            parameters["min_sup"] = min_sup
+        queries.append((rng.choice(["mine", "rules"]), parameters))
+
+    print(f"[!] Sending {n_requests} requests with {concurrency} in flight...")
+
+    t1 = perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(
+            lambda query: request(port, *query), queries))
+    t2 = perf_counter()
+
+    latencies = sorted(latency for latency, _ in results)
+    n_errors = sum(not succeeded for _, succeeded in results)
+
+    print(f"Throughput: {n_requests / (t2 - t1):.1f} requests/s ({t2 - t1:.2f}s)")
+    print(f"Latency: p50 {percentile(latencies, 0.5) * 1000:.1f}ms, p95 {percentile(latencies, 0.95) * 1000:.1f}ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms")
+    print(f"Errors: {n_errors}")
+
+    with urlopen(f"http://127.0.0.1:{port}/stats") as response:
+        stats = json.load(response)
+
+    for cache in ["time_series", "event_sequences", "trees", "rule_counts"]:
+        print(f"Cache {cache}: {stats[cache]['hits']} hits, {stats[cache]['misses']} misses")
+
+    # A fresh process has to import, parse, perform SAX and mine before answering
+    if cold:
+        command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mine.py"), tickers[0], "--offline",
+                   "-a", str(alphabet_size), "-o", "discard"]
+        if min_sups[0]:
+            command += ["-s", str(min_sups[0])]
+
+        t1 = perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        t2 = perf_counter()
+
+        print(f"Cold mine.py process: {(t2 - t1) * 1000:.1f}ms")
@@ -8,22 +8,29 @@ Date: 09/03/2021
 
 import sys
 import os.path
-from algorithms import manepi
-from utils import get_stock_data, get_time_series, convert_to_event_sequence
+from algorithms import manepi, approximate_manepi, derive_min_sup
+from utils import ensure_stock_data, get_time_series, get_dated_time_series, join_time_series, convert_to_event_sequences, merge_event_sequences
+from utils.profiler import Profiler
 
 VALID_ARGS = ["-w", "--word-length", "-a", "--alphabet_size",
-              "-s", "--min-sup", "-c", "--min-conf", "-h", "--help"]
+              "-s", "--min-sup", "-c", "--min-conf", "-h", "--help",
+              "--profile", "--profile-out", "-f", "--file", "--offline",
+              "-o", "--occurrences", "-i", "--interval", "-r", "--resolutions",
+              "-e", "--episodes", "--approximate", "--verify", "--sample-window", "--sample-error", "--engine"]
 
 
 def print_help():
     print(
         """
     Tool to discover frequently occurring episodes and frequent episode rules for a specific stock ticker.
+    Several comma separated tickers, e.g. AAPL,MSFT, are mined together with event types such as AAPL:B,
+    finding episodes which span several tickers. Results are written to results/<TICKER>_<TICKER>.
 
-    *! Before using this tool please make sure you have set an environment variable ALPHA_VANTAGE_KEY to your alpha vantage API key. !*
+    *! Before fetching data please make sure you have set an environment variable ALPHA_VANTAGE_KEY to your alpha vantage API key. !*
 
     USAGE:
         python src/mine.py <TICKER> <OPTIONS>
+        python src/mine.py <TICKER>,<TICKER>,... <OPTIONS>
         python src/mine.py -h or python mine.py --help
 
     TESTING:
@@ -33,8 +40,21 @@ def print_help():
         -h or --help: Displays this message.
         -w or --word-length: Set the word length parameter for the SAX algorithm - Range: (0 1]. (Default: 0.8 * Length of data)
         -a or --alphabet-size: Set the alphabet size parameter for the SAX algorithm. (Default: 26)
-        -s or --min-sup: Set the minimum support value for MANEPI. (Default 0.01 * Length of event sequence)
+        -s or --min-sup: Set the minimum support value for MANEPI. (Default 0.01 * Length of event sequence, an error is raised if this is below 5)
         -c or --min-conf: Set the minimum confidence value for MANEPI. (Default: 0.75)
+        -i or --interval: Mine intraday bars of the given size instead of daily bars: 1min, 5min, 15min, 30min or 60min.
+        -r or --resolutions: Comma separated word lengths - Range: (0 1], e.g. 0.2,0.4,0.8. SAX is performed for all of them in one pass and each is mined separately into results/<TICKER>/w<WORD LENGTH>. Overrides -w.
+        -f or --file: Mine a local csv file (time,open,high,low,close,volume) instead of fetching data. Results are still written to results/<TICKER>.
+        --offline: Never fetch data, only use data that has previously been fetched for the ticker.
+        -o or --occurrences: What to do with the minimal occurrences of an episode once it has been grown: keep, discard or spill. (Default: discard)
+        -e or --episodes: Which frequent episodes to mine: all, closed (no longer episode has the same support) or maximal (no longer episode is frequent). Episodes containing one with a longer episode of the same minimal occurrences are not grown. (Default: all)
+        --approximate: Estimate episode supports from the given fraction of the event sequence - Range: (0 1], sampled in windows of events. Much faster on long sequences, but some episodes may be missed or wrongly reported as frequent. The fraction is raised when the sample would be too small for the minimum support. -o and -e are ignored.
+        --verify: With --approximate, compute the exact support of every estimated episode and only output the frequent ones.
+        --sample-window: With --approximate, the number of events in each sampled window. Only occurrences within one window are counted. (Default: 100)
+        --sample-error: With --approximate, the relative error allowed for estimated supports - Range: [0 1). The sample is mined with a minimum support lowered by this fraction. (Default: 0.1)
+        --engine: How minimal occurrences are computed: list, bitmap, or auto to use bitmaps for alphabets of up to 26 event types. (Default: auto)
+        --profile: Print the time and peak memory of each stage as well as candidate and pruning counts per episode length.
+        --profile-out: Also write the profile to a file, a cProfile report if the file ends in .prof, otherwise a JSON report. Implies --profile.
 
     INFORMATION:
         Author: Nerius Ilmonas
@@ -58,6 +78,19 @@ if __name__ == "__main__":
     min_sup = 0
 
     ticker = ""
+    profile = False
+    profile_output = ""
+    csv_file = ""
+    offline = False
+    occurrence_mode = "discard"
+    interval = None
+    resolutions = []
+    episode_mode = "all"
+    sample_rate = 0
+    verify = False
+    sample_window = 100
+    sample_error = 0.1
+    engine = "auto"
 
     # Handle options
     if "-h" in sys.argv or "--help" in sys.argv:
@@ -95,35 +128,171 @@ if __name__ == "__main__":
         except:
             min_conf = float(args[args.index("--min-conf") + 1])
 
+    if "-f" in args or "--file" in args:
+        try:
+            csv_file = args[args.index("-f") + 1]
+        except:
+            csv_file = args[args.index("--file") + 1]
+
+    if "--offline" in args:
+        offline = True
+
+    if "-o" in args or "--occurrences" in args:
+        try:
+            occurrence_mode = args[args.index("-o") + 1]
+        except:
+            occurrence_mode = args[args.index("--occurrences") + 1]
+
+    if "-i" in args or "--interval" in args:
+        try:
+            interval = args[args.index("-i") + 1]
+        except:
+            interval = args[args.index("--interval") + 1]
+
+    if "-r" in args or "--resolutions" in args:
+        try:
+            resolutions = [float(resolution) for resolution in args[args.index(
+                "-r") + 1].split(",")]
+        except:
+            resolutions = [float(resolution) for resolution in args[args.index(
+                "--resolutions") + 1].split(",")]
+
+    if "-e" in args or "--episodes" in args:
+        try:
+            episode_mode = args[args.index("-e") + 1]
+        except:
+            episode_mode = args[args.index("--episodes") + 1]
+
+    if "--approximate" in args:
+        sample_rate = float(args[args.index("--approximate") + 1])
+
+    if "--verify" in args:
+        verify = True
+
+    if "--sample-window" in args:
+        sample_window = int(args[args.index("--sample-window") + 1])
+
+    if "--sample-error" in args:
+        sample_error = float(args[args.index("--sample-error") + 1])
+
+    if "--engine" in args:
+        engine = args[args.index("--engine") + 1]
+
+    if "--profile-out" in args:
+        profile_output = args[args.index("--profile-out") + 1]
+        profile = True
+
+    if "--profile" in args:
+        profile = True
+
+    profiler = Profiler(enabled=profile, cprofile=profile_output.endswith(
+        (".prof", ".pstats")))
+    profiler.start()
+
     # Check if result directory exists, if it doesn't make one
     if not os.path.isdir("results"):
         os.mkdir("results")
 
+    # Several comma separated tickers are mined together as one merged event sequence
+    tickers = ticker.split(",")
+    ticker = "_".join(tickers)
+
+    if csv_file and len(tickers) > 1:
+        raise Exception("A local csv file can only be mined for a single ticker")
+
     # Download stock data
-    if not get_stock_data(ticker):
-        print(
-            f"Data for ${ticker} has previously been fetched, skipping fetching...")
+    with profiler.stage("fetch"):
+        for stock in tickers:
+            if csv_file:
+                os.makedirs(f"results/{stock}", exist_ok=True)
+                print(f"Using local data from {csv_file}, skipping fetching...")
+            elif offline:
+                ensure_stock_data(stock, interval, offline)
+                print(
+                    f"Offline mode, using previously fetched data for ${stock}...")
+            else:
+                if not ensure_stock_data(stock, interval):
+                    print(
+                        f"Data for ${stock} has previously been fetched, skipping fetching...")
 
     # Parse stock data into event sequence
     print("[!] Converting csv data into a sequence...")
-    time_series = get_time_series(ticker)
+    with profiler.stage("parse"):
+        if len(tickers) > 1:
+            # Only the bars at times which every ticker has are used, so that
+            # the events of different tickers line up in time
+            time_series = join_time_series({stock: get_dated_time_series(
+                stock, None, interval) for stock in tickers})
+        else:
+            time_series = {ticker: get_time_series(
+                ticker, csv_file, interval)}
 
-    word_length = int(word_length * len(time_series)
-                      ) if word_length else int(word_length_multiplier * len(time_series))
+    length = len(time_series[tickers[0]])
 
-    print("[!] Generating event sequence...")
-    event_sequence = convert_to_event_sequence(
-        time_series, word_length, alphabet_size)
+    if not resolutions:
+        resolutions = [word_length if word_length else word_length_multiplier]
 
-    # Mine stock data for patterns
-    min_sup = min_sup if min_sup else int(
-        min_sup_multiplier * len(event_sequence))
+    word_lengths = [int(resolution * length) for resolution in resolutions]
 
-    print("[!] Discovering frequent episodes in event sequence...")
-    FEPT = manepi(event_sequence, min_sup, min_conf)
-
-    # Output tree to .txt files
-    FEPT.output_to_file(ticker)
+    print("[!] Generating event sequence...")
+    with profiler.stage("sax"):
+        ticker_event_sequences = {stock: convert_to_event_sequences(
+            series, word_lengths, alphabet_size, profiler) for stock, series in time_series.items()}
+
+    # Intraday results are kept apart from daily results
+    output_directory = f"results/{ticker}/{interval}" if interval else f"results/{ticker}"
+
+    for word_length in ticker_event_sequences[tickers[0]]:
+        directory = output_directory
+        if len(word_lengths) > 1:
+            directory += f"/w{word_length}"
+        os.makedirs(directory, exist_ok=True)
+
+        if len(tickers) > 1:
+            event_sequence = merge_event_sequences(
+                {stock: event_sequences[word_length] for stock, event_sequences in ticker_event_sequences.items()})
+        else:
+            event_sequence = ticker_event_sequences[ticker][word_length]
+
+        # Mine stock data for patterns
+        # Short resolutions can scale the default too low to mine
+        sequence_min_sup = min_sup if min_sup else derive_min_sup(
+            min_sup_multiplier, len(tickers) * word_length)
 
-    # Show user some information
-    print(f"Found {FEPT.n_frequent_episodes} frequently occurring episodes and {FEPT.n_frequent_episode_rules} frequent episode rules with min_sup = {FEPT.min_sup} and min_conf = {FEPT.min_conf}")
+        print(
+            f"[!] Discovering frequent episodes in event sequence (word length = {word_length})...")
+        with profiler.stage(f"manepi (word length = {word_length})"):
+            if sample_rate:
+                FEPT = approximate_manepi(list(event_sequence), sequence_min_sup, min_conf,
+                                          sample_rate, sample_window, sample_error, verify=verify)
+            else:
+                FEPT = manepi(event_sequence, sequence_min_sup, min_conf,
+                              profiler.new_mining_stats(f"word length = {word_length}"), occurrence_mode, episode_mode=episode_mode, engine=engine)
+
+        # Output tree to .txt files
+        with profiler.stage(f"output (word length = {word_length})"):
+            FEPT.output_to_file(ticker, directory)
+
+        # Spilled occurrences are not needed once the results are written
+        FEPT.close()
+
+        # Show user some information
+        print(f"Found {FEPT.n_frequent_episodes} frequently occurring episodes and {FEPT.n_frequent_episode_rules} frequent episode rules with min_sup = {FEPT.min_sup} and min_conf = {FEPT.min_conf}")
+
+        profiler.set_counter(
+            f"Frequent episodes (word length = {word_length})", FEPT.n_frequent_episodes)
+        profiler.set_counter(
+            f"Frequent episode rules (word length = {word_length})", FEPT.n_frequent_episode_rules)
+
+    profiler.stop()
+
+    if profile:
+        profiler.set_counter("Time series length", length)
+        profiler.set_counter("Alphabet size", alphabet_size)
+
+        print()
+        print(profiler.summary())
+
+        if profile_output:
+            profiler.dump(profile_output)
+            print(f"Profile written to {profile_output}")
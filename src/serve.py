@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+
+"""
+This script runs a local mining service which answers mining and episode rule queries over HTTP,
+keeping recently used time series, event sequences and mined FEPTs in memory between requests
+"""
+
+import sys
+import os.path
+import re
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from time import perf_counter
+from urllib.parse import urlparse, parse_qs
+from algorithms import manepi, derive_min_sup
+from structures import EpisodeRule
+from utils import ensure_stock_data, get_time_series, convert_to_event_sequences
+from utils.cache import LRUCache
+
+# Tickers and intervals become part of the paths data is read from and written to,
+# so they may not contain separators or start with a dot
+NAME_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9.\-]*")
+
+
+def print_help():
+    print(
+        """
+    Tool to run a local mining service, keeping recent results in memory so repeated questions are answered instantly.
+
+    USAGE:
+        python src/serve.py <OPTIONS>
+        python src/serve.py -h or python serve.py --help
+
+    OPTIONS:
+        -h or --help: Displays this message.
+        -p or --port: Port to listen on at 127.0.0.1. (Default: 8000)
+        -j or --jobs: Number of processes performing SAX and mining. (Default: number of CPUs)
+        -n or --cache-size: Number of time series, event sequences, FEPTs and rule counts each kept in memory. (Default: 32)
+        --offline: Never fetch data, only use data that has previously been fetched.
+
+    ENDPOINTS:
+        GET /mine?ticker=<TICKER>: Mine a ticker and return the number of frequent episodes and episode rules.
+        GET /rules?ticker=<TICKER>&antecedent=<EVENTS>: Return the episode rules of a ticker, by default all of
+            them, or only those predicting what follows the space separated antecedent, e.g. antecedent=A+B.
+        GET /stats: Return the number of requests served and the hits and misses of each cache.
+
+    Tickers and intervals may only contain letters, digits, dots and dashes, and may not start with a dot.
+
+    PARAMETERS:
+        word_length: Word length for the SAX algorithm - Range: (0 1]. (Default: 0.8)
+        alphabet_size: Alphabet size for the SAX algorithm. (Default: 26)
+        min_sup: Minimum support value for MANEPI. (Default: 0.01 * Length of event sequence, an error is returned if this is below 5)
+        min_conf: Minimum confidence value for rules. (Default: 0.75)
+        interval: Mine intraday bars of the given size instead of daily bars: 1min, 5min, 15min, 30min or 60min.
+        episodes: Which frequent episodes to mine: all, closed or maximal. (Default: all)
+        engine: How minimal occurrences are computed: list, bitmap or auto. (Default: auto)
+        limit: Maximum number of rules returned by /rules, the most confident first. (Default: 100)
+    """
+    )
+    return
+
+
+def convert(time_series, word_length, alphabet_size):
+    """
+    Convert a time series into an event sequence, run in a worker process
+    """
+
+    return convert_to_event_sequences(time_series, [word_length], alphabet_size)[word_length]
+
+
+def mine(event_sequence, min_sup, episode_mode, engine):
+    """
+    Mine an event sequence, run in a worker process. Rules are generated
+    for the confidence of each request, so the FEPT does not depend on it.
+    Occurrences are discarded, as a FEPT which spilled them can not be sent
+    back from the worker.
+    """
+
+    return manepi(event_sequence, min_sup, 0, occurrence_mode="discard",
+                  episode_mode=episode_mode, engine=engine)
+
+
+def get_rules(FEPT, node, min_conf):
+    """
+    Collect the episode rules from a node to its children with at least the given confidence.
+    The FEPT is shared between requests, so unlike get_all_frequent_episodes_and_episode_rules
+    this does not store anything on it.
+    """
+
+    if node is FEPT.root:
+        return []
+
+    rules = []
+    for event_type, child in node.children.items():
+        if not child.stored:
+            continue
+
+        confidence = FEPT.get_rule_confidence(node, child, min_conf)
+        if confidence is not None:
+            rules.append(EpisodeRule(node.label, event_type, child.support, confidence))
+
+    return rules
+
+
+class MiningService:
+    """
+    Answers mining and rule queries from warm in-memory state. Time series are
+    parsed in the service itself, while SAX and mining run in a process pool.
+    Each stage is cached separately, so a query which only changes the minimum
+    support reuses the event sequence, and one which only changes the minimum
+    confidence reuses the FEPT.
+    """
+
+    def __init__(self, jobs=None, cache_size=32, offline=False):
+        self.executor = ProcessPoolExecutor(jobs)
+        self.offline = offline
+
+        self.time_series = LRUCache(cache_size)
+        self.event_sequences = LRUCache(cache_size)
+        self.trees = LRUCache(cache_size)
+        self.rule_counts = LRUCache(cache_size)
+
+        self.n_requests = 0
+        self.lock = threading.Lock()
+
+    def get_time_series(self, ticker, interval):
+        """
+        Get the time series of a ticker, fetching its data if needed
+        """
+
+        def load():
+            ensure_stock_data(ticker, interval, self.offline)
+            return get_time_series(ticker, None, interval)
+
+        return self.time_series.get((ticker, interval), load)
+
+    def get_event_sequence(self, ticker, interval, word_length, alphabet_size):
+        """
+        Get the event sequence of a ticker for the given SAX parameters
+        """
+
+        def load():
+            time_series = self.get_time_series(ticker, interval)
+            return self.executor.submit(convert, time_series, int(word_length * len(time_series)), alphabet_size).result()
+
+        return self.event_sequences.get((ticker, interval, word_length, alphabet_size), load)
+
+    def get_FEPT(self, query):
+        """
+        Get the FEPT mined with the parameters of a query, along with the key it is cached with
+        """
+
+        event_sequence = self.get_event_sequence(
+            query["ticker"], query["interval"], query["word_length"], query["alphabet_size"])
+
+        # Short event sequences can scale the default too low to mine
+        min_sup = query["min_sup"] or derive_min_sup(0.01, len(event_sequence))
+
+        def load():
+            return self.executor.submit(mine, event_sequence, min_sup, query["episodes"], query["engine"]).result()
+
+        key = (query["ticker"], query["interval"], query["word_length"], query["alphabet_size"],
+               min_sup, query["episodes"], query["engine"])
+
+        return key, self.trees.get(key, load)
+
+    def mine(self, query):
+        """
+        Mine a ticker, returning the number of frequent episodes and episode rules
+        """
+
+        key, FEPT = self.get_FEPT(query)
+
+        # Counting the rules walks the whole FEPT, so it is only done once per confidence
+        def count():
+            nodes = list(FEPT.root.children.values())
+            n_rules = 0
+            for node in nodes:
+                nodes.extend(node.children.values())
+                n_rules += len(get_rules(FEPT, node, query["min_conf"]))
+            return n_rules
+
+        n_rules = self.rule_counts.get((key, query["min_conf"]), count)
+
+        return {"ticker": query["ticker"], "min_sup": FEPT.min_sup, "min_conf": query["min_conf"],
+                "frequent_episodes": FEPT.n_frequent_episodes, "episode_rules": n_rules}
+
+    def rules(self, query):
+        """
+        Get the most confident episode rules of a ticker, optionally only those of an antecedent
+        """
+
+        _, FEPT = self.get_FEPT(query)
+
+        if query["antecedent"]:
+            node = FEPT.find(query["antecedent"].split())
+            rules = get_rules(FEPT, node, query["min_conf"]) if node else []
+        else:
+            nodes = list(FEPT.root.children.values())
+            rules = []
+            for node in nodes:
+                nodes.extend(node.children.values())
+                rules.extend(get_rules(FEPT, node, query["min_conf"]))
+
+        rules.sort(key=lambda rule: rule.confidence, reverse=True)
+
+        return {"ticker": query["ticker"], "rules": [
+            {"antecedent": rule.antecedent, "consequent": rule.consequent,
+             "support": rule.support, "confidence": rule.confidence, "rule": str(rule)}
+            for rule in rules[:query["limit"]]]}
+
+    def count_request(self):
+        """
+        Count a served request, requests are handled in separate threads
+        """
+
+        with self.lock:
+            self.n_requests += 1
+
+    def stats(self):
+        """
+        Get the number of requests served and the state of each cache
+        """
+
+        return {"requests": self.n_requests, "time_series": self.time_series.to_dict(),
+                "event_sequences": self.event_sequences.to_dict(), "trees": self.trees.to_dict(),
+                "rule_counts": self.rule_counts.to_dict()}
+
+
+def parse_query(query_string):
+    """
+    Read the parameters of a request, falling back to the defaults of mine.py
+    """
+
+    parameters = {key: values[-1]
+                  for key, values in parse_qs(query_string).items()}
+
+    if "ticker" not in parameters:
+        raise Exception("Please provide a ticker")
+
+    for name in ["ticker", "interval"]:
+        if name in parameters and not NAME_PATTERN.fullmatch(parameters[name]):
+            raise Exception(
+                f"Invalid {name}, expected letters, digits, dots and dashes")
+
+    return {
+        "ticker": parameters["ticker"],
+        "interval": parameters.get("interval"),
+        "word_length": float(parameters.get("word_length", 0.8)),
+        "alphabet_size": int(parameters.get("alphabet_size", 26)),
+        "min_sup": int(parameters.get("min_sup", 0)),
+        "min_conf": float(parameters.get("min_conf", 0.75)),
+        "episodes": parameters.get("episodes", "all"),
+        "engine": parameters.get("engine", "auto"),
+        "antecedent": parameters.get("antecedent", ""),
+        "limit": int(parameters.get("limit", 100))
+    }
+
+
+class MiningServer(ThreadingHTTPServer):
+    """
+    HTTP server handling each request in its own thread
+    """
+
+    # Queue more connections than the default of 5, so that bursts
+    # of requests are not refused and retried by the clients
+    request_queue_size = 128
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes GET requests to the mining service and answers them with JSON
+    """
+
+    service = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+
+        t1 = perf_counter()
+        try:
+            if url.path == "/mine":
+                status, body = 200, self.service.mine(parse_query(url.query))
+            elif url.path == "/rules":
+                status, body = 200, self.service.rules(parse_query(url.query))
+            elif url.path == "/stats":
+                status, body = 200, self.service.stats()
+            else:
+                status, body = 404, {"error": f"Unknown endpoint {url.path}"}
+        except Exception as exception:
+            status, body = 400, {"error": str(exception)}
+        t2 = perf_counter()
+
+        self.service.count_request()
+        body["time"] = t2 - t1
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Requests are counted in /stats rather than logged one by one
+        return
+
+
+if __name__ == "__main__":
+
+    # Defaults
+    port = 8000
+    jobs = None
+    cache_size = 32
+    offline = False
+
+    # Handle options
+    if "-h" in sys.argv or "--help" in sys.argv:
+        print_help()
+        sys.exit(0)
+
+    args = sys.argv[1:]
+
+    if "-p" in args or "--port" in args:
+        try:
+            port = int(args[args.index("-p") + 1])
+        except:
+            port = int(args[args.index("--port") + 1])
+
+    if "-j" in args or "--jobs" in args:
+        try:
+            jobs = int(args[args.index("-j") + 1])
+        except:
+            jobs = int(args[args.index("--jobs") + 1])
+
+    if "-n" in args or "--cache-size" in args:
+        try:
+            cache_size = int(args[args.index("-n") + 1])
+        except:
+            cache_size = int(args[args.index("--cache-size") + 1])
+
+    if "--offline" in args:
+        offline = True
+
+    # Check if result directory exists, if it doesn't make one
+    if not os.path.isdir("results"):
+        os.mkdir("results")
+
+    RequestHandler.service = MiningService(jobs, cache_size, offline)
+    server = MiningServer(("127.0.0.1", port), RequestHandler)
+
+    print(f"[!] Serving on http://127.0.0.1:{port}, press Ctrl+C to stop...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        RequestHandler.service.executor.shutdown()
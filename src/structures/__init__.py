@@ -6,3 +6,5 @@ Date: 13/03/2021
 
 from structures.event import Event
 from structures.fept import FrequentEpisodePrefixTree, FrequentEpisodePrefixTreeNode
+from structures.occurrences import OccurrenceFile
+from structures.matcher import RuleMatcher, EpisodeRule
@@ -8,6 +8,15 @@ Date: 13/03/2021
 
 # Implementation for this trie is adapted from: https://www.askpython.com/python/examples/trie-data-structure
 
+from types import MappingProxyType
+from structures.occurrences import OccurrenceFile
+
+# What to do with the minimal occurrences of a node once it has been fully grown
+OCCURRENCE_MODES = ["keep", "discard", "spill"]
+
+# Shared by all leaves until they get their first child, as most nodes are leaves
+NO_CHILDREN = MappingProxyType({})
+
 
 class FrequentEpisodePrefixTree:
     """
@@ -21,9 +30,12 @@ class FrequentEpisodePrefixTree:
         Constructor, sets all the initial required values for the FEPT
         """
 
-        self.root = FrequentEpisodePrefixTreeNode("", None, None)
+        self.root = FrequentEpisodePrefixTreeNode(None, None, None, None)
         self.n_frequent_episodes = 0
         self.n_frequent_episode_rules = 0
+        self.n_nodes = 0
+        self.occurrence_mode = "keep"
+        self.occurrence_file = None
 
     def set_min_sup(self, min_sup):
         """
@@ -39,6 +51,21 @@ class FrequentEpisodePrefixTree:
 
         self.min_conf = min_conf
 
+    def set_occurrence_mode(self, occurrence_mode, directory=None):
+        """
+        Set what happens to the minimal occurrences of a node once it has
+        been fully grown. They are either kept in memory, discarded, or
+        spilled to a memory-mapped file in the given directory.
+        """
+
+        if occurrence_mode not in OCCURRENCE_MODES:
+            raise Exception(
+                f"Invalid occurrence mode, expected one of {OCCURRENCE_MODES}")
+
+        self.occurrence_mode = occurrence_mode
+        if occurrence_mode == "spill":
+            self.occurrence_file = OccurrenceFile(directory)
+
     def set_frequent_one_episodes(self, frequent_one_episodes):
         """
         Set and store all the frequent 1-episodes
@@ -57,37 +84,146 @@ class FrequentEpisodePrefixTree:
                 node = node.children[letter]
             else:
                 new_node = FrequentEpisodePrefixTreeNode(
-                    label, minimal_occurrences, support)
+                    letter, node, minimal_occurrences, support)
+                if not node.children:
+                    node.children = {}
                 node.children[letter] = new_node
                 node = new_node
 
         self.n_frequent_episodes += 1
+        self.n_nodes += 1
         return node
 
+    def remove(self, node):
+        """
+        Remove a node and its whole subtree from the FEPT,
+        returning the removed nodes
+        """
+
+        del node.parent.children[node.symbol]
+
+        nodes = [node]
+        for removed in nodes:
+            nodes.extend(removed.children.values())
+
+        self.n_frequent_episodes -= sum(removed.stored for removed in nodes)
+        self.n_nodes -= len(nodes)
+        return nodes
+
+    def unstore(self, node):
+        """
+        Keep a node in the tree for navigation, but stop
+        reporting it as a frequent episode
+        """
+
+        if node.stored:
+            node.stored = False
+            self.n_frequent_episodes -= 1
+
+    def prune_unstored(self, node=None):
+        """
+        Remove all subtrees which do not contain any stored
+        nodes, returning whether the given node's subtree
+        contains a stored node
+        """
+
+        node = node or self.root
+
+        for letter, child in list(node.children.items()):
+            if not self.prune_unstored(child):
+                del node.children[letter]
+                self.n_nodes -= 1
+
+        return node.stored or bool(node.children)
+
+    def release_occurrences(self, node):
+        """
+        Release the minimal occurrences of a node which will no
+        longer be needed for growing the tree
+        """
+
+        if self.occurrence_mode == "keep":
+            return
+
+        if self.occurrence_mode == "spill":
+            node.spilled = self.occurrence_file.spill(
+                node.minimal_occurrences)
+
+        node.minimal_occurrences = None
+
+    def get_minimal_occurrences(self, node):
+        """
+        Get the minimal occurrences of a node, reading them back
+        from the occurrence file if they have been spilled
+        """
+
+        if node.minimal_occurrences is None and node.spilled:
+            if self.occurrence_file is None:
+                raise Exception(
+                    "The occurrence file has been closed, spilled occurrences can no longer be read")
+            return self.occurrence_file.load(node.spilled)
+
+        return node.minimal_occurrences
+
+    def close(self):
+        """
+        Close and delete the occurrence file if occurrences were spilled.
+        Spilled occurrences can no longer be read afterwards.
+        """
+
+        if self.occurrence_file is not None:
+            self.occurrence_file.close()
+            self.occurrence_file = None
+
+    def __getstate__(self):
+        """
+        Pickle the FEPT, e.g. to send it between processes. Spilled occurrences
+        live in a memory-mapped file of this process, so they can not be sent along.
+        """
+
+        if self.occurrence_file is not None:
+            raise Exception(
+                "A FEPT with spilled occurrences can not be pickled, mine it with another occurrence mode")
+
+        return self.__dict__
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
     def exists(self, label):
         """
         Check if a node exists in the tree already
         """
 
+        return self.find(label) is not None
+
+    def find(self, label):
+        """
+        Get the node with a given label, or None if it does not exist
+        """
+
         node = self.root
         for letter in label:
             if letter in node.children:
                 node = node.children[letter]
             else:
-                return False
-        return True
+                return None
+        return node
 
     def dfs(self, node):
         """
         Perform a depth-first search starting from a given node
         """
 
-        # Do not append root node to output
-        if node.label:
+        # Do not append root node or nodes which are only kept for navigation to output
+        if node is not self.root and node.stored:
             self.frequent_episodes.append(node)
 
         for child in node.children.values():
-            if node.label:
+            if node is not self.root and child.stored:
                 episode_rule = self.get_episode_rule(node, child)
                 if episode_rule:
                     self.episode_rules.append(episode_rule)
@@ -104,6 +240,7 @@ class FrequentEpisodePrefixTree:
         node = self.root
         self.frequent_episodes = []
         self.episode_rules = []
+        self.n_frequent_episode_rules = 0
 
         self.dfs(node)
 
@@ -115,46 +252,115 @@ class FrequentEpisodePrefixTree:
         """
 
         # Get the confidence of the rule
-        rule_conf = (child.support / node.support)
+        rule_conf = self.get_rule_confidence(node, child)
 
-        if rule_conf >= self.min_conf:
+        if rule_conf is not None:
             return f"{node.fmt_label} -> {child.fmt_label} (Support: {child.support}) (Confidence: {rule_conf * 100:.2f}%)"
 
         # Else return nothing
         return
 
-    def output_to_file(self, ticker):
+    def get_rule_confidence(self, node, child, min_conf=None):
         """
-        Outputs the frequently occurring episodes and episode
-        rules to .txt files
+        Get the confidence of the episode rule from a node to its child, or None
+        if it is below the confidence threshold, by default that of the FEPT
+        """
+
+        rule_conf = (child.support / node.support)
+
+        if rule_conf >= (self.min_conf if min_conf is None else min_conf):
+            return rule_conf
+
+        return
+
+    def format_results(self):
+        """
+        Format the frequently occurring episodes and episode
+        rules as the lines of their output files
         """
 
         # Get frequent episodes and episode rules
         frequent_episodes, episode_rules = self.get_all_frequent_episodes_and_episode_rules()
 
-        # Output frequent epsidodes
-        with open(f"results/{ticker}/frequent_episodes.txt", "w") as f:
-            print("Episode" + "\t" * 10 + "Support", file=f)
-            for episode in frequent_episodes:
-                print(f"{episode.fmt_label:<50}{episode.support}", file=f)
+        episode_lines = ["Episode" + "\t" * 10 + "Support"] + \
+            [f"{episode.fmt_label:<50}{episode.support}" for episode in frequent_episodes]
+
+        return episode_lines, episode_rules
+
+    def output_to_file(self, ticker, directory=None):
+        """
+        Outputs the frequently occurring episodes and episode
+        rules to .txt files, by default in the ticker's results directory
+        """
 
-        # Output episode rules
-        with open(f"results/{ticker}/episode_rules.txt", "w") as f:
-            for rule in episode_rules:
-                print(rule, file=f)
+        write_results(directory or f"results/{ticker}", *self.format_results())
+
+
+def write_results(directory, episode_lines, rule_lines):
+    """
+    Write formatted frequent episodes and episode rules to .txt files
+    """
+
+    # Output frequent epsidodes
+    with open(f"{directory}/frequent_episodes.txt", "w") as f:
+        for line in episode_lines:
+            print(line, file=f)
+
+    # Output episode rules
+    with open(f"{directory}/episode_rules.txt", "w") as f:
+        for line in rule_lines:
+            print(line, file=f)
 
 
 class FrequentEpisodePrefixTreeNode:
     """
     Represents a node of the FEPT.
-    Stores the nodes label, minimal_occurences set and its support value
+    Stores the last event of the node's label, its parent, its
+    minimal_occurences set and its support value. The full label
+    is rebuilt from the parents when needed, so each node only
+    takes constant memory no matter how long its episode is.
     """
 
-    def __init__(self, label, minimal_occurrences, support):
-        self.label = label
+    __slots__ = ("symbol", "parent", "minimal_occurrences",
+                 "support", "spilled", "stored", "children")
+
+    def __init__(self, symbol, parent, minimal_occurrences, support):
+        self.symbol = symbol
+        self.parent = parent
         self.minimal_occurrences = minimal_occurrences
         self.support = support
-        self.children = {}
+        self.spilled = None
+        self.stored = True
+        self.children = NO_CHILDREN
+
+    def __getstate__(self):
+        """
+        Pickle a node, e.g. to send a mined FEPT between processes. The shared
+        empty children can not be pickled, so leaves get them back on unpickling.
+        """
+
+        return (self.symbol, self.parent, self.minimal_occurrences, self.support,
+                self.spilled, self.stored, self.children or None)
+
+    def __setstate__(self, state):
+        (self.symbol, self.parent, self.minimal_occurrences, self.support,
+         self.spilled, self.stored, children) = state
+        self.children = children or NO_CHILDREN
+
+    @property
+    def label(self):
+        """
+        Return the label of the node by following its parents ["A", "B"]
+        """
+
+        label = []
+        node = self
+        while node.parent is not None:
+            label.append(node.symbol)
+            node = node.parent
+
+        label.reverse()
+        return label
 
     @property
     def fmt_label(self):
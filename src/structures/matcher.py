@@ -0,0 +1,162 @@
+"""
+A compiled matcher which scores a live stream of events against the
+episode rules stored in a FEPT.
+"""
+
+# The matcher is an Aho-Corasick automaton built from: https://cr.yp.to/bib/1975/aho.pdf
+
+
+class EpisodeRule:
+    """
+    Represents an episode rule antecedent -> antecedent + consequent,
+    predicting that the consequent event type follows the antecedent.
+    """
+
+    def __init__(self, antecedent, consequent, support, confidence):
+        self.antecedent = antecedent
+        self.consequent = consequent
+        self.support = support
+        self.confidence = confidence
+
+    def __str__(self):
+        antecedent = " ".join(self.antecedent)
+        return f"{antecedent} -> {antecedent} {self.consequent} (Support: {self.support}) (Confidence: {self.confidence * 100:.2f}%)"
+
+
+class RuleMatcher:
+    """
+    Deterministic automaton over the episodes of a FEPT. Each state is
+    an episode, and the current state is the longest episode which the
+    most recent events spell out. Every state knows the rules of all
+    the episodes that end with it, so matching an event is a single
+    transition, regardless of the number of rules.
+
+    By default antecedents are matched against consecutive events. Mined
+    episodes may have other events in between, so given a window the
+    matcher instead follows every episode whose events occurred in order
+    within the window, keeping the latest start of each, which costs a
+    transition per followed episode rather than a single one per event.
+    """
+
+    def __init__(self, FEPT, window=None):
+        """
+        Compile the matcher from a mined FEPT. With a window, an antecedent
+        matches when its events occur in order within that many time units.
+        """
+
+        if window is not None and window < 1:
+            raise Exception("Invalid window, expected at least 1")
+
+        self.window = window
+
+        # Transitions of each state by event type, and the rules whose antecedent ends in it
+        self.transitions = [{}]
+        self.rules = [()]
+        self.n_rules = 0
+
+        # Build the trie of episodes, visiting shorter episodes first
+        nodes = [(FEPT.root, 0)]
+        for node, state in nodes:
+            rules = []
+            for event_type, child in node.children.items():
+                child_state = len(self.transitions)
+                self.transitions.append({})
+                self.rules.append(())
+                self.transitions[state][event_type] = child_state
+                nodes.append((child, child_state))
+
+                # Rules towards episodes only kept for navigation are not reported
+                if node is FEPT.root or not child.stored:
+                    continue
+
+                confidence = FEPT.get_rule_confidence(node, child)
+                if confidence is not None:
+                    rules.append(EpisodeRule(
+                        node.label, event_type, child.support, confidence))
+
+            self.rules[state] = tuple(rules)
+            self.n_rules += len(rules)
+
+        # Gapped matching follows the episodes of the trie itself, and every suffix
+        # of an episode is followed separately, so no failures are needed
+        self.children = [dict(children) for children in self.transitions]
+        self.own_rules = list(self.rules)
+
+        # The failure of a state is its longest proper suffix which is also a state.
+        # Its missing transitions are those of its failure, and the rules of its failure
+        # are completed along with it. States are visited in order of length, so the
+        # failure of a state has always been completed first.
+        failures = [0] * len(self.transitions)
+        for _, state in nodes:
+            children = self.transitions[state]
+
+            if state:
+                failure = failures[state]
+                self.transitions[state] = {
+                    **self.transitions[failure], **children}
+                self.rules[state] += self.rules[failure]
+
+                for event_type, child_state in children.items():
+                    failures[child_state] = self.transitions[failure].get(
+                        event_type, 0)
+
+        self.state = 0
+        self.starts = {}
+
+    def reset(self):
+        """
+        Forget all the events seen so far
+        """
+
+        self.state = 0
+        self.starts = {}
+
+    def match(self, event):
+        """
+        Consume the next event, returning the rules whose antecedent
+        has just been completed by it
+        """
+
+        if self.window is not None:
+            return self.match_gapped(event)
+
+        self.state = self.transitions[self.state].get(event.type, 0)
+        return self.rules[self.state]
+
+    def match_gapped(self, event):
+        """
+        Consume the next event with other events allowed in between the events
+        of an antecedent. The starts map each followed episode to the latest
+        time it started at, as a later start stays in the window for longer.
+        """
+
+        # Episodes which started too long ago can no longer be extended in the window
+        starts = {state: start for state, start in self.starts.items()
+                  if event.time - start < self.window}
+
+        # Extend from the events before this one only, so it is used once per episode
+        reached = {}
+        child_state = self.children[0].get(event.type)
+        if child_state is not None:
+            reached[child_state] = event.time
+
+        for state, start in starts.items():
+            child_state = self.children[state].get(event.type)
+            if child_state is not None and reached.get(child_state, start - 1) < start:
+                reached[child_state] = start
+
+        for state, start in reached.items():
+            if starts.get(state, start - 1) < start:
+                starts[state] = start
+
+        self.starts = starts
+        return tuple(rule for state in reached for rule in self.own_rules[state])
+
+    def match_all(self, event_sequence):
+        """
+        Consume a sequence of events, yielding each event along
+        with the rules whose antecedent it completed
+        """
+
+        for event in event_sequence:
+            yield event, self.match(event)
@@ -0,0 +1,75 @@
+"""
+A memory-mapped side file for storing minimal occurrences that are
+no longer needed while mining but may be queried afterwards.
+"""
+
+import mmap
+import tempfile
+from array import array
+from itertools import chain
+
+
+class OccurrenceFile:
+    """
+    Stores lists of [start, end] occurrences as 64-bit integers in a
+    temporary file, returning their location so they can be read back
+    through a memory map when needed.
+    """
+
+    def __init__(self, directory=None):
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.length = 0
+        self.map = None
+
+    def spill(self, occurrences):
+        """
+        Write a list of occurrences to the file and return its location
+        """
+
+        data = array("q", chain.from_iterable(occurrences))
+        self.file.write(data.tobytes())
+
+        location = (self.length, len(occurrences))
+        self.length += len(data)
+
+        # The file has grown, so any existing map is out of date
+        self.close_map()
+
+        return location
+
+    def load(self, location):
+        """
+        Read a list of occurrences back from the file
+        """
+
+        offset, count = location
+        if not count:
+            return []
+
+        if self.map is None:
+            self.file.flush()
+            self.map = mmap.mmap(self.file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+
+        data = array("q")
+        data.frombytes(
+            self.map[offset * data.itemsize:(offset + 2 * count) * data.itemsize])
+
+        return [[data[i], data[i + 1]] for i in range(0, len(data), 2)]
+
+    def close_map(self):
+        """
+        Close the memory map if one is open
+        """
+
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    def close(self):
+        """
+        Close the memory map and delete the file
+        """
+
+        self.close_map()
+        self.file.close()
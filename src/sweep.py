@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+"""
+This script mines a stock ticker for every combination of SAX and MANEPI+ parameters in a grid
+and summarises the results, to help choose parameters for mine.py
+"""
+
+import sys
+import os.path
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from algorithms import manepi, derive_min_sup
+from utils import ensure_stock_data, get_time_series, convert_to_event_sequence_grid
+
+VALID_ARGS = ["-w", "--word-lengths", "-a", "--alphabet-sizes",
+              "-s", "--min-sups", "-c", "--min-conf", "-h", "--help",
+              "-j", "--jobs", "-f", "--file", "--offline", "-i", "--interval"]
+
+
+def print_help():
+    print(
+        """
+    Tool to mine a stock ticker for every combination of word length, alphabet size and minimum support.
+
+    USAGE:
+        python src/sweep.py <TICKER> <OPTIONS>
+        python src/sweep.py -h or python sweep.py --help
+
+    OPTIONS:
+        -h or --help: Displays this message.
+        -w or --word-lengths: Comma separated word lengths - Range: (0 1], as a fraction of the length of the data. (Default: 0.2,0.4,0.8)
+        -a or --alphabet-sizes: Comma separated alphabet sizes. (Default: 5,10,26)
+        -s or --min-sups: Comma separated minimum supports - Range: (0 1], as a fraction of the length of the event sequence, each has to give at least 5. (Default: 0.01,0.02,0.05)
+        -c or --min-conf: Set the minimum confidence value for MANEPI. (Default: 0.75)
+        -j or --jobs: Number of processes to mine with. (Default: number of CPUs)
+        -i or --interval: Mine intraday bars of the given size instead of daily bars: 1min, 5min, 15min, 30min or 60min.
+        -f or --file: Mine a local csv file (time,open,high,low,close,volume) instead of fetching data.
+        --offline: Never fetch data, only use data that has previously been fetched for the ticker.
+
+    The summary is printed and written to results/<TICKER>/sweep.txt, or results/<TICKER>/<INTERVAL>/sweep.txt for intraday bars.
+    """
+    )
+    return
+
+
+def mine_configuration(configuration):
+    """
+    Mine one event sequence and return the number of frequent episodes,
+    episode rules and the time taken, run in a separate process
+    """
+
+    event_sequence, min_sup, min_conf = configuration
+
+    t1 = perf_counter()
+
+    FEPT = manepi(event_sequence, min_sup, min_conf, occurrence_mode="discard")
+    FEPT.get_all_frequent_episodes_and_episode_rules()
+
+    t2 = perf_counter()
+
+    return FEPT.n_frequent_episodes, FEPT.n_frequent_episode_rules, t2 - t1
+
+
+if __name__ == "__main__":
+
+    # Defaults
+    word_length_multipliers = [0.2, 0.4, 0.8]
+    alphabet_sizes = [5, 10, 26]
+    min_sup_multipliers = [0.01, 0.02, 0.05]
+    min_conf = 0.75
+    jobs = None
+
+    csv_file = ""
+    offline = False
+    interval = None
+
+    # Handle options
+    if len(sys.argv) < 2 or "-h" in sys.argv or "--help" in sys.argv:
+        print_help()
+        sys.exit(0)
+
+    if sys.argv[1] in VALID_ARGS:
+        raise Exception("Please provide a ticker")
+
+    ticker = sys.argv[1]
+
+    args = sys.argv[1:]
+
+    if "-w" in args or "--word-lengths" in args:
+        try:
+            word_length_multipliers = [float(word_length) for word_length in args[args.index(
+                "-w") + 1].split(",")]
+        except:
+            word_length_multipliers = [float(word_length) for word_length in args[args.index(
+                "--word-lengths") + 1].split(",")]
+
+    if "-a" in args or "--alphabet-sizes" in args:
+        try:
+            alphabet_sizes = [int(alphabet_size) for alphabet_size in args[args.index(
+                "-a") + 1].split(",")]
+        except:
+            alphabet_sizes = [int(alphabet_size) for alphabet_size in args[args.index(
+                "--alphabet-sizes") + 1].split(",")]
+
+    if "-s" in args or "--min-sups" in args:
+        try:
+            min_sup_multipliers = [float(min_sup) for min_sup in args[args.index(
+                "-s") + 1].split(",")]
+        except:
+            min_sup_multipliers = [float(min_sup) for min_sup in args[args.index(
+                "--min-sups") + 1].split(",")]
+
+    if "-c" in args or "--min-conf" in args:
+        try:
+            min_conf = float(args[args.index("-c") + 1])
+        except:
+            min_conf = float(args[args.index("--min-conf") + 1])
+
+    if "-j" in args or "--jobs" in args:
+        try:
+            jobs = int(args[args.index("-j") + 1])
+        except:
+            jobs = int(args[args.index("--jobs") + 1])
+
+    if "-f" in args or "--file" in args:
+        try:
+            csv_file = args[args.index("-f") + 1]
+        except:
+            csv_file = args[args.index("--file") + 1]
+
+    if "--offline" in args:
+        offline = True
+
+    if "-i" in args or "--interval" in args:
+        try:
+            interval = args[args.index("-i") + 1]
+        except:
+            interval = args[args.index("--interval") + 1]
+
+    # Get stock data
+    os.makedirs(f"results/{ticker}", exist_ok=True)
+    if csv_file:
+        print(f"Using local data from {csv_file}, skipping fetching...")
+    else:
+        ensure_stock_data(ticker, interval, offline)
+
+    time_series = get_time_series(ticker, csv_file, interval)
+
+    # Perform SAX once for the whole grid
+    print("[!] Generating event sequences...")
+    word_lengths = [int(word_length * len(time_series))
+                    for word_length in word_length_multipliers]
+
+    t1 = perf_counter()
+    event_sequences = convert_to_event_sequence_grid(
+        time_series, word_lengths, alphabet_sizes)
+    t2 = perf_counter()
+
+    print(
+        f"Generated {len(event_sequences)} event sequences ({t2 - t1:.2f}s)")
+
+    configurations = [(word_length, alphabet_size, derive_min_sup(min_sup_multiplier, word_length))
+                      for word_length in word_lengths
+                      for alphabet_size in alphabet_sizes
+                      for min_sup_multiplier in min_sup_multipliers]
+
+    # Mine every configuration, spread over several processes
+    print(f"[!] Mining {len(configurations)} configurations...")
+    with ProcessPoolExecutor(jobs) as executor:
+        results = list(executor.map(mine_configuration, [
+            (event_sequences[word_length, alphabet_size], min_sup, min_conf)
+            for word_length, alphabet_size, min_sup in configurations]))
+
+    # Output summary table
+    header = f"{'Word length':<15}{'Alphabet size':<15}{'Min sup':<10}{'Episodes':<12}{'Rules':<12}Time (s)"
+    lines = [f"{word_length:<15}{alphabet_size:<15}{min_sup:<10}{n_episodes:<12}{n_rules:<12}{time_taken:.2f}"
+             for (word_length, alphabet_size, min_sup), (n_episodes, n_rules, time_taken) in zip(configurations, results)]
+
+    summary = "\n".join([header] + lines)
+    print(summary)
+
+    # Intraday results are kept apart from daily results
+    output_directory = f"results/{ticker}/{interval}" if interval else f"results/{ticker}"
+    os.makedirs(output_directory, exist_ok=True)
+
+    with open(f"{output_directory}/sweep.txt", "w") as f:
+        print(summary, file=f)
@@ -5,7 +5,7 @@ Author: Nerius Ilmonas
 Date: 24/03/2021
 """
 
-from testing import test_sax, test_manepi
+from testing import test_rule_matcher, test_pipeline, test_sax, test_manepi, test_manepi_memory, test_manepi_episode_modes, test_manepi_cross_ticker, test_manepi_approximate, test_manepi_engines, test_manepi_rolling, test_fept_memory
 import sys
 
 
@@ -20,6 +20,51 @@ if __name__ == "__main__":
         test_manepi()
         print("[!] MANEPI testing complete")
         sys.exit(0)
+    elif "-manepi-memory" in sys.argv:
+        print("[!] Testing MANEPI+ memory usage...")
+        test_manepi_memory()
+        print("[!] MANEPI+ memory testing complete")
+        sys.exit(0)
+    elif "-fept-memory" in sys.argv:
+        print("[!] Testing FEPT memory usage...")
+        test_fept_memory()
+        print("[!] FEPT memory testing complete")
+        sys.exit(0)
+    elif "-manepi-modes" in sys.argv:
+        print("[!] Testing MANEPI+ closed and maximal episode modes...")
+        test_manepi_episode_modes()
+        print("[!] MANEPI+ episode mode testing complete")
+        sys.exit(0)
+    elif "-manepi-cross" in sys.argv:
+        print("[!] Testing cross-ticker MANEPI+...")
+        test_manepi_cross_ticker()
+        print("[!] Cross-ticker MANEPI+ testing complete")
+        sys.exit(0)
+    elif "-manepi-approximate" in sys.argv:
+        print("[!] Testing approximate MANEPI+...")
+        test_manepi_approximate()
+        print("[!] Approximate MANEPI+ testing complete")
+        sys.exit(0)
+    elif "-manepi-engines" in sys.argv:
+        print("[!] Testing MANEPI+ list and bitmap engines...")
+        test_manepi_engines()
+        print("[!] MANEPI+ engine testing complete")
+        sys.exit(0)
+    elif "-manepi-rolling" in sys.argv:
+        print("[!] Testing rolling MANEPI+...")
+        test_manepi_rolling()
+        print("[!] Rolling MANEPI+ testing complete")
+        sys.exit(0)
+    elif "-matcher" in sys.argv:
+        print("[!] Testing rule matcher...")
+        test_rule_matcher()
+        print("[!] Rule matcher testing complete")
+        sys.exit(0)
+    elif "-pipeline" in sys.argv:
+        print("[!] Testing pipeline...")
+        test_pipeline()
+        print("[!] Pipeline testing complete")
+        sys.exit(0)
     else:
         print("Please specify which algorithm to test")
         sys.exit(0)
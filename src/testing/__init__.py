@@ -1,9 +1,12 @@
 """
-Module for testing our algorithms.
+Module for testing our algorithms. The test_* functions plot their results,
+they only import matplotlib once they actually need to plot something.
 
 Author: Nerius Ilmonas
 Date: 24/03/2021
 """
 
 from testing.sax import test_sax
-from testing.manepi import test_manepi
+from testing.manepi import test_manepi, test_manepi_memory, test_manepi_episode_modes, test_manepi_cross_ticker, test_manepi_approximate, test_manepi_engines, test_manepi_rolling, test_fept_memory
+from testing.matcher import test_rule_matcher
+from testing.pipeline import test_pipeline
@@ -5,12 +5,14 @@ Author: Nerius Ilmonas
 Date: 24/03/2021
 """
 
-from algorithms import manepi
+from algorithms import manepi, approximate_manepi, RollingMiner
 from algorithms.sax import get_alphabet
-from structures import Event
+from structures import Event, FrequentEpisodePrefixTree
+from utils import convert_to_event_sequence, merge_event_sequences
+import itertools
 import random
 import time
-import matplotlib.pyplot as plt
+import tracemalloc
 
 
 def event_sequence_size_test():
@@ -99,7 +101,493 @@ def frequent_episodes_size_test():
     return times, sizes
 
 
+def occurrence_memory_test():
+    # For each way of handling minimal occurrences we lower the min_sup
+    # to find more and more frequent episodes and record the peak memory
+    # used while mining, along with the depth of the deepest episode.
+
+    event_types = get_alphabet(5)
+    event_sequence = [Event(random.choice(event_types), j)
+                      for j in range(2000)]
+    min_conf = 1
+
+    results = {}
+    for occurrence_mode in ["keep", "discard", "spill"]:
+        peaks = []
+        sizes = []
+        depths = []
+        for i in range(10):
+            min_sup = 80 - 5 * i
+
+            tracemalloc.start()
+
+            FEPT = manepi(event_sequence, min_sup, min_conf,
+                          occurrence_mode=occurrence_mode)
+
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            frequent_episodes, _ = FEPT.get_all_frequent_episodes_and_episode_rules()
+
+            peaks.append(peak / 2**20)
+            sizes.append(FEPT.n_frequent_episodes)
+            depths.append(max(len(episode.label)
+                              for episode in frequent_episodes))
+
+        results[occurrence_mode] = (peaks, sizes, depths)
+
+    return results
+
+
+def episode_mode_test():
+    # A long repeated pattern with a little noise makes every sub-prefix of the pattern
+    # frequent, so we compare how many nodes are kept, how many episodes are output
+    # and how long mining and collecting the episodes takes for each episode mode.
+    # Closed and maximal mining do not grow episodes which are part of a longer one
+    # with the same minimal occurrences, which most of them are with little noise.
+
+    event_types = get_alphabet(5)
+    pattern = [random.choice(event_types) for _ in range(8)]
+    event_sequence = [Event(event_type if random.random() < 0.98 else random.choice(event_types), j)
+                      for j, event_type in enumerate(pattern * 40)]
+    min_conf = 0.5
+
+    results = {}
+    for episode_mode in ["all", "closed", "maximal"]:
+        mining_times = []
+        output_times = []
+        nodes = []
+        sizes = []
+        min_sups = []
+        for i in range(6):
+            min_sup = 30 - 2 * i
+
+            t1 = time.time_ns()
+
+            FEPT = manepi(event_sequence, min_sup, min_conf,
+                          episode_mode=episode_mode)
+
+            t2 = time.time_ns()
+
+            FEPT.get_all_frequent_episodes_and_episode_rules()
+
+            t3 = time.time_ns()
+
+            mining_times.append((t2 - t1) / 1e9)
+            output_times.append((t3 - t2) / 1e9)
+            nodes.append(FEPT.n_nodes)
+            sizes.append(FEPT.n_frequent_episodes)
+            min_sups.append(min_sup)
+
+        results[episode_mode] = (min_sups, mining_times,
+                                 output_times, nodes, sizes)
+
+    return results
+
+
+def test_manepi_episode_modes():
+    import matplotlib.pyplot as plt
+
+    results = episode_mode_test()
+
+    fig = plt.figure()
+    ax1 = fig.add_subplot(131)
+    ax2 = fig.add_subplot(132)
+    ax3 = fig.add_subplot(133)
+
+    for episode_mode, (min_sups, mining_times, output_times, nodes, sizes) in results.items():
+        ax1.plot(min_sups, nodes, label=episode_mode)
+        ax2.plot(min_sups, mining_times, label=episode_mode)
+        ax3.plot(min_sups, output_times, label=episode_mode)
+
+        print(f"{episode_mode}: " + ", ".join(
+            f"min_sup {min_sup} => {size} episodes, {node} nodes, mined in {mining_time:.2f}s, collected in {output_time:.3f}s"
+            for min_sup, mining_time, output_time, node, size in zip(min_sups, mining_times, output_times, nodes, sizes)))
+
+    # Set labels
+    ax1.set_title("FEPT Size against Minimum Support")
+    ax1.set_xlabel("Minimum support")
+    ax1.set_ylabel("Number of FEPT nodes")
+    ax1.legend()
+
+    ax2.set_title("Mining Time against Minimum Support")
+    ax2.set_xlabel("Minimum support")
+    ax2.set_ylabel("Time taken (s)")
+    ax2.legend()
+
+    ax3.set_title("Collection Time against Minimum Support")
+    ax3.set_xlabel("Minimum support")
+    ax3.set_ylabel("Time taken (s)")
+    ax3.legend()
+
+    plt.show()
+
+
+def cross_ticker_test():
+    # Here we mine the merged event sequence of more and more tickers, each a random walk,
+    # comparing the k-way merge against concatenating and sorting the event sequences
+
+    word_length = 100
+    alphabet_size = 8
+    min_sup = 15
+    min_conf = 0.5
+
+    merge_times = []
+    sort_times = []
+    mining_times = []
+    sizes = []
+    for n_tickers in [10, 50, 100, 250, 500]:
+        event_sequences = {}
+        for i in range(n_tickers):
+            prices = [0]
+            for _ in range(2 * word_length - 1):
+                prices.append(prices[-1] + random.gauss(0, 1))
+            event_sequences[f"T{i}"] = convert_to_event_sequence(
+                prices, word_length, alphabet_size)
+
+        t1 = time.time_ns()
+
+        event_sequence = list(merge_event_sequences(event_sequences))
+
+        t2 = time.time_ns()
+
+        sorted([Event(f"{ticker}:{event.type}", event.time) for ticker, sequence in event_sequences.items()
+                for event in sequence], key=lambda event: event.time)
+
+        t3 = time.time_ns()
+
+        manepi(event_sequence, min_sup, min_conf)
+
+        t4 = time.time_ns()
+
+        merge_times.append((t2 - t1) / 1e9)
+        sort_times.append((t3 - t2) / 1e9)
+        mining_times.append((t4 - t3) / 1e9)
+        sizes.append(n_tickers)
+
+    return merge_times, sort_times, mining_times, sizes
+
+
+def test_manepi_cross_ticker():
+    import matplotlib.pyplot as plt
+
+    merge_times, sort_times, mining_times, sizes = cross_ticker_test()
+
+    for n_tickers, merge_time, sort_time, mining_time in zip(sizes, merge_times, sort_times, mining_times):
+        print(f"{n_tickers} tickers: merged in {merge_time:.3f}s (sorted in {sort_time:.3f}s), mined in {mining_time:.2f}s")
+
+    fig = plt.figure()
+    ax1 = fig.add_subplot(121)
+    ax2 = fig.add_subplot(122)
+
+    ax1.plot(sizes, merge_times, label="k-way merge")
+    ax1.plot(sizes, sort_times, label="concatenate and sort")
+
+    # Set labels
+    ax1.set_title("Merging Time against Number of Tickers")
+    ax1.set_xlabel("Number of tickers")
+    ax1.set_ylabel("Time taken (s)")
+    ax1.legend()
+
+    ax2.plot(sizes, mining_times)
+
+    # Set labels
+    ax2.set_title("Mining Time against Number of Tickers")
+    ax2.set_xlabel("Number of tickers")
+    ax2.set_ylabel("Time taken (s)")
+
+    plt.show()
+
+
+def approximate_test():
+    # For each sample rate we estimate the frequent episodes of a long event
+    # sequence, with and without verifying them, and compare them against
+    # the frequent episodes found by exact mining
+
+    event_types = get_alphabet(5)[:5]
+    event_sequence = [Event(random.choice(event_types), j)
+                      for j in range(20000)]
+    min_sup = int(0.04 * len(event_sequence))
+    min_conf = 0.5
+
+    t1 = time.time_ns()
+
+    frequent_episodes, _ = manepi(event_sequence, min_sup, min_conf).get_all_frequent_episodes_and_episode_rules()
+
+    t2 = time.time_ns()
+
+    exact_time = (t2 - t1) / 1e9
+    exact = {tuple(episode.label) for episode in frequent_episodes}
+
+    results = {}
+    for verify in [False, True]:
+        times = []
+        precisions = []
+        recalls = []
+        sample_rates = [0.05, 0.1, 0.2, 0.5]
+        for sample_rate in sample_rates:
+            t1 = time.time_ns()
+
+            frequent_episodes, _ = approximate_manepi(
+                event_sequence, min_sup, min_conf, sample_rate, verify=verify).get_all_frequent_episodes_and_episode_rules()
+
+            t2 = time.time_ns()
+
+            approximate = {tuple(episode.label)
+                           for episode in frequent_episodes}
+            found = len(approximate & exact)
+
+            times.append((t2 - t1) / 1e9)
+            precisions.append(found / len(approximate)
+                              if approximate else 1)
+            recalls.append(found / len(exact) if exact else 1)
+
+        results[verify] = (sample_rates, times, precisions, recalls)
+
+    return exact_time, results
+
+
+def test_manepi_approximate():
+    import matplotlib.pyplot as plt
+
+    exact_time, results = approximate_test()
+
+    print(f"exact: {exact_time:.2f}s")
+
+    fig = plt.figure()
+    ax1 = fig.add_subplot(121)
+    ax2 = fig.add_subplot(122)
+
+    for verify, (sample_rates, times, precisions, recalls) in results.items():
+        label = "verified" if verify else "estimated"
+
+        print(f"{label}: " + ", ".join(
+            f"sample rate {sample_rate} => {time_taken:.2f}s ({exact_time / time_taken:.1f}x), precision {precision:.3f}, recall {recall:.3f}"
+            for sample_rate, time_taken, precision, recall in zip(sample_rates, times, precisions, recalls)))
+
+        ax1.plot(sample_rates, [exact_time / time_taken for time_taken in times], label=label)
+        ax2.plot(sample_rates, precisions, label=f"{label} precision")
+        ax2.plot(sample_rates, recalls, label=f"{label} recall")
+
+    # Set labels
+    ax1.set_title("Speed-up against Sample Rate")
+    ax1.set_xlabel("Sample rate")
+    ax1.set_ylabel("Speed-up over exact mining")
+    ax1.legend()
+
+    ax2.set_title("Precision and Recall against Sample Rate")
+    ax2.set_xlabel("Sample rate")
+    ax2.set_ylabel("Precision / Recall")
+    ax2.legend()
+
+    plt.show()
+
+
+def engine_test():
+    # Here we compare the list and bitmap engines as the number of event types grows,
+    # scaling the min_sup with the number of occurrences of each event type
+
+    event_sequence_size = 3000
+    min_conf = 1
+
+    results = {}
+    for engine in ["list", "bitmap"]:
+        times = []
+        sizes = []
+        for n_event_types in [2, 3, 5, 8, 12, 16, 20]:
+            event_types = get_alphabet(26)[:n_event_types]
+            event_sequence = [Event(random.choice(event_types), j)
+                              for j in range(event_sequence_size)]
+            min_sup = int(0.4 * event_sequence_size / n_event_types)
+
+            t1 = time.time_ns()
+
+            manepi(event_sequence, min_sup, min_conf,
+                   occurrence_mode="discard", engine=engine)
+
+            t2 = time.time_ns()
+
+            times.append((t2 - t1) / 1e9)
+            sizes.append(n_event_types)
+
+        results[engine] = (times, sizes)
+
+    return results
+
+
+def test_manepi_engines():
+    import matplotlib.pyplot as plt
+
+    results = engine_test()
+
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+
+    for engine, (times, sizes) in results.items():
+        ax.plot(sizes, times, label=engine)
+
+        print(f"{engine}: " + ", ".join(
+            f"{size} event types => {time_taken:.2f}s" for time_taken, size in zip(times, sizes)))
+
+    # Set labels
+    ax.set_title("Scaling with Number of Event Types")
+    ax.set_xlabel("Number of event types")
+    ax.set_ylabel("Time taken (s)")
+    ax.legend()
+
+    plt.show()
+
+
+def rolling_test():
+    # For each window length we slide a window over an event sequence, updating
+    # the rolling miner and mining every window from scratch, and check that
+    # both find the same frequent episodes
+
+    event_types = get_alphabet(5)[:5]
+    event_sequence = [Event(random.choice(event_types), j)
+                      for j in range(1000)]
+    min_conf = 0.5
+
+    rolling_times = []
+    full_times = []
+    window_lengths = [50, 100, 200, 400]
+    for window_length in window_lengths:
+        min_sup = int(0.06 * window_length)
+        miner = RollingMiner(window_length, min_sup, min_conf)
+
+        rolling_time = 0
+        full_time = 0
+        for i, event in enumerate(event_sequence):
+            t1 = time.time_ns()
+
+            FEPT = miner.push(event)
+
+            t2 = time.time_ns()
+
+            window = event_sequence[max(0, i + 1 - window_length):i + 1]
+            expected = manepi(window, min_sup, min_conf)
+
+            t3 = time.time_ns()
+
+            rolling_time += (t2 - t1) / 1e9
+            full_time += (t3 - t2) / 1e9
+
+            frequent_episodes, episode_rules = FEPT.get_all_frequent_episodes_and_episode_rules()
+            expected_frequent_episodes, expected_episode_rules = expected.get_all_frequent_episodes_and_episode_rules()
+
+            if {(tuple(episode.label), episode.support) for episode in frequent_episodes} != {(tuple(episode.label), episode.support) for episode in expected_frequent_episodes} or set(episode_rules) != set(expected_episode_rules):
+                raise Exception(
+                    f"Rolling MANEPI+ differs from full mining at event {i} with window length {window_length}")
+
+        rolling_times.append(rolling_time)
+        full_times.append(full_time)
+
+    return rolling_times, full_times, window_lengths
+
+
+def test_manepi_rolling():
+    import matplotlib.pyplot as plt
+
+    rolling_times, full_times, window_lengths = rolling_test()
+
+    print(", ".join(f"window length {window_length} => rolling {rolling_time:.2f}s, full {full_time:.2f}s ({full_time / rolling_time:.1f}x)"
+                    for rolling_time, full_time, window_length in zip(rolling_times, full_times, window_lengths)))
+
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+
+    ax.plot(window_lengths, rolling_times, label="rolling")
+    ax.plot(window_lengths, full_times, label="full")
+
+    # Set labels
+    ax.set_title("Sliding Window Mining Time against Window Length")
+    ax.set_xlabel("Window length")
+    ax.set_ylabel("Time taken (s)")
+    ax.legend()
+
+    plt.show()
+
+
+def fept_memory_test():
+    # Here we insert every episode over 4 event types up to a growing maximum
+    # length into a FEPT, and record its memory per million episodes
+
+    event_types = get_alphabet(4)[:4]
+
+    memory = []
+    depths = []
+    for depth in range(2, 11):
+        labels = [label for length in range(1, depth + 1)
+                  for label in itertools.product(event_types, repeat=length)]
+
+        tracemalloc.start()
+
+        FEPT = FrequentEpisodePrefixTree()
+        for label in labels:
+            FEPT.insert(list(label), None, 1)
+
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        memory.append(size / 2**20 / len(labels) * 1e6)
+        depths.append(depth)
+
+    return memory, depths
+
+
+def test_fept_memory():
+    import matplotlib.pyplot as plt
+
+    memory, depths = fept_memory_test()
+
+    print(", ".join(f"depth {depth} => {size:.0f}MiB per million episodes" for size, depth in zip(memory, depths)))
+
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+
+    ax.plot(depths, memory)
+
+    # Set labels
+    ax.set_title("FEPT Memory against Episode Length")
+    ax.set_xlabel("Length of the longest episode")
+    ax.set_ylabel("Memory per million episodes (MiB)")
+
+    plt.show()
+
+
+def test_manepi_memory():
+    import matplotlib.pyplot as plt
+
+    results = occurrence_memory_test()
+
+    fig = plt.figure()
+    ax1 = fig.add_subplot(121)
+    ax2 = fig.add_subplot(122)
+
+    for occurrence_mode, (peaks, sizes, depths) in results.items():
+        ax1.plot(sizes, peaks, label=occurrence_mode)
+        ax2.plot(depths, peaks, "o", label=occurrence_mode)
+
+        print(f"{occurrence_mode}: " + ", ".join(
+            f"{size} episodes (depth {depth}) => {peak:.2f}MiB" for peak, size, depth in zip(peaks, sizes, depths)))
+
+    # Set labels
+    ax1.set_title("Peak Memory against Number of Frequent Episodes")
+    ax1.set_xlabel("Number of frequent episodes")
+    ax1.set_ylabel("Peak memory (MiB)")
+    ax1.legend()
+
+    ax2.set_title("Peak Memory against Search Depth")
+    ax2.set_xlabel("Length of the longest frequent episode")
+    ax2.set_ylabel("Peak memory (MiB)")
+    ax2.legend()
+
+    plt.show()
+
+
 def test_manepi():
+    import matplotlib.pyplot as plt
+
     fig = plt.figure()
     ax1 = fig.add_subplot(131)
     ax2 = fig.add_subplot(132)
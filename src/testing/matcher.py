@@ -0,0 +1,95 @@
+"""
+Testing for the online rule matcher.
+"""
+
+from algorithms import manepi
+from algorithms.sax import get_alphabet
+from structures import Event, RuleMatcher
+import random
+import time
+
+
+def rescan_rules(rules, history):
+    # Check every rule against the most recent events, which is
+    # what we would have to do on every new event without the matcher
+
+    return [rule for rule in rules if history[-len(rule.antecedent):] == rule.antecedent]
+
+
+def rule_matcher_throughput_test():
+    # For this test we lower the min_sup to mine more and more rules,
+    # then time matching a stream of events with the compiled matcher
+    # and by rescanning the recent events for every rule
+
+    event_types = get_alphabet(5)[:5]
+    event_sequence = [Event(random.choice(event_types), j)
+                      for j in range(1000)]
+    stream = [Event(random.choice(event_types), j) for j in range(5000)]
+    min_conf = 0.2
+
+    window = 10
+
+    matcher_throughputs = []
+    gapped_throughputs = []
+    rescan_throughputs = []
+    sizes = []
+    for i in range(8):
+        min_sup = 80 - 5 * i
+        FEPT = manepi(event_sequence, min_sup, min_conf)
+        matcher = RuleMatcher(FEPT)
+        gapped_matcher = RuleMatcher(FEPT, window)
+
+        # States share the rules of their suffixes, so each rule is only counted once
+        rules = list({id(rule): rule for state_rules in matcher.rules
+                      for rule in state_rules}.values())
+
+        t1 = time.time_ns()
+
+        for event in stream:
+            matcher.match(event)
+
+        t2 = time.time_ns()
+
+        history = []
+        for event in stream:
+            history.append(event.type)
+            rescan_rules(rules, history)
+
+        t3 = time.time_ns()
+
+        for event in stream:
+            gapped_matcher.match(event)
+
+        t4 = time.time_ns()
+
+        matcher_throughputs.append(len(stream) / ((t2 - t1) / 1e9))
+        rescan_throughputs.append(len(stream) / ((t3 - t2) / 1e9))
+        gapped_throughputs.append(len(stream) / ((t4 - t3) / 1e9))
+        sizes.append(matcher.n_rules)
+
+    return matcher_throughputs, gapped_throughputs, rescan_throughputs, sizes
+
+
+def test_rule_matcher():
+    import matplotlib.pyplot as plt
+
+    matcher_throughputs, gapped_throughputs, rescan_throughputs, sizes = rule_matcher_throughput_test()
+
+    for size, matcher_throughput, gapped_throughput, rescan_throughput in zip(sizes, matcher_throughputs, gapped_throughputs, rescan_throughputs):
+        print(f"{size} rules: {matcher_throughput:.0f} events/s matched, {gapped_throughput:.0f} events/s matched with gaps, {rescan_throughput:.0f} events/s rescanned")
+
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+
+    ax.plot(sizes, matcher_throughputs, label="compiled matcher")
+    ax.plot(sizes, gapped_throughputs, label="compiled matcher with gaps")
+    ax.plot(sizes, rescan_throughputs, label="rescanning every rule")
+
+    # Set labels
+    ax.set_title("Throughput against Number of Episode Rules")
+    ax.set_xlabel("Number of episode rules")
+    ax.set_ylabel("Events per second")
+    ax.set_yscale("log")
+    ax.legend()
+
+    plt.show()
@@ -0,0 +1,99 @@
+"""
+Testing for the staged pipeline runner.
+"""
+
+from functools import partial
+from algorithms import manepi
+from algorithms.sax import get_alphabet
+from structures import Event
+from utils.pipeline import Stage, Pipeline
+import random
+import time
+
+
+def wait(seconds, item):
+    # Stands in for fetching or writing, which mostly waits on the network or disk
+
+    time.sleep(seconds)
+    return item
+
+
+def generate(n_events, seed):
+    # Stands in for parsing and SAX
+
+    rng = random.Random(seed)
+    event_types = get_alphabet(5)[:5]
+    return [Event(rng.choice(event_types), j) for j in range(n_events)]
+
+
+def mine(event_sequence):
+    FEPT = manepi(event_sequence, int(0.05 * len(event_sequence)), 0.5,
+                  occurrence_mode="discard")
+    return FEPT.n_frequent_episodes
+
+
+def pipeline_test():
+    # Here we run the same number of tickers through every stage one after
+    # another, and through the pipeline with more and more mining workers
+
+    n_tickers = 16
+    stages = [
+        ("fetch", partial(wait, 0.2)),
+        ("sax", partial(generate, 8000)),
+        ("manepi", mine),
+        ("output", partial(wait, 0.05))
+    ]
+
+    t1 = time.time_ns()
+
+    for seed in range(n_tickers):
+        item = seed
+        for _, function in stages:
+            item = function(item)
+
+    t2 = time.time_ns()
+
+    sequential_time = (t2 - t1) / 1e9
+
+    times = []
+    pipelines = []
+    workers = [1, 2, 4]
+    for n_workers in workers:
+        pipeline = Pipeline([
+            Stage("fetch", stages[0][1]),
+            Stage("sax", stages[1][1], kind="cpu"),
+            Stage("manepi", stages[2][1], kind="cpu", workers=n_workers),
+            Stage("output", stages[3][1])
+        ])
+
+        pipeline.run(range(n_tickers))
+
+        times.append(pipeline.time)
+        pipelines.append(pipeline)
+
+    return sequential_time, times, pipelines, workers
+
+
+def test_pipeline():
+    import matplotlib.pyplot as plt
+
+    sequential_time, times, pipelines, workers = pipeline_test()
+
+    print(f"sequential: {sequential_time:.2f}s")
+    for n_workers, time_taken, pipeline in zip(workers, times, pipelines):
+        print(f"pipelined with {n_workers} mining workers: {time_taken:.2f}s ({sequential_time / time_taken:.1f}x)")
+        print(pipeline.summary())
+
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+
+    ax.plot(workers, times, label="pipelined")
+    ax.plot(workers, [sequential_time] * len(workers), label="sequential")
+
+    # Set labels
+    ax.set_title("Time to Mine 16 Tickers against Mining Workers")
+    ax.set_xlabel("Number of mining workers")
+    ax.set_ylabel("Time taken (s)")
+    ax.legend()
+
+    plt.show()
@@ -6,9 +6,9 @@ Date: 24/03/2021
 """
 
 from algorithms import sax
+from algorithms.sax import sax_pyramid, sax_grid
 import random
 import time
-import matplotlib.pyplot as plt
 
 
 def data_size_test():
@@ -97,12 +97,76 @@ def alphabet_size_test():
     return times, sizes
 
 
+def pyramid_test():
+    # Testing SAX for several word lengths at once against one SAX run per word length
+    sax_times = []
+    pyramid_times = []
+    sizes = []
+
+    # Create a random data set the size of a few months of minute bars
+    data = [random.random() for _ in range(100000)]
+
+    alphabet_size = 10
+    for i in range(8):
+        # Halve the word length for each extra resolution
+        word_lengths = [50000 // 2**j for j in range(i + 1)]
+
+        # Time one SAX run per word length
+        t1 = time.time_ns()
+        for word_length in word_lengths:
+            sax(data, word_length, alphabet_size)
+        t2 = time.time_ns()
+
+        # Time the pyramid
+        sax_pyramid(data, word_lengths, alphabet_size)
+        t3 = time.time_ns()
+
+        sax_times.append((t2 - t1) / 1e9)
+        pyramid_times.append((t3 - t2) / 1e9)
+        sizes.append(len(word_lengths))
+
+    return sax_times, pyramid_times, sizes
+
+
+def grid_test():
+    # Testing SAX for a grid of word lengths and alphabet sizes against one SAX run per combination
+    sax_times = []
+    grid_times = []
+    sizes = []
+
+    data = [random.random() for _ in range(20000)]
+
+    word_lengths = [10000 // 2**j for j in range(4)]
+    for i in range(6):
+        alphabet_sizes = [2**(j + 2) for j in range(i + 1)]
+
+        # Time one SAX run per combination
+        t1 = time.time_ns()
+        for word_length in word_lengths:
+            for alphabet_size in alphabet_sizes:
+                sax(data, word_length, alphabet_size)
+        t2 = time.time_ns()
+
+        # Time the grid
+        sax_grid(data, word_lengths, alphabet_sizes)
+        t3 = time.time_ns()
+
+        sax_times.append((t2 - t1) / 1e9)
+        grid_times.append((t3 - t2) / 1e9)
+        sizes.append(len(word_lengths) * len(alphabet_sizes))
+
+    return sax_times, grid_times, sizes
+
+
 def test_sax():
+    import matplotlib.pyplot as plt
 
     fig = plt.figure()
-    ax1 = fig.add_subplot(131)
-    ax2 = fig.add_subplot(132)
-    ax3 = fig.add_subplot(133)
+    ax1 = fig.add_subplot(151)
+    ax2 = fig.add_subplot(152)
+    ax3 = fig.add_subplot(153)
+    ax4 = fig.add_subplot(154)
+    ax5 = fig.add_subplot(155)
 
     # Test scaling with data size
     times_test1, sizes_test1 = data_size_test()
@@ -131,4 +195,29 @@ def test_sax():
     ax3.set_xlabel("Alphabet size")
     ax3.set_ylabel("Time taken (s)")
 
+    # Test SAX for several word lengths against the pyramid
+    sax_times, pyramid_times, sizes_test4 = pyramid_test()
+    ax4.plot(sizes_test4, sax_times, label="sax per word length")
+    ax4.plot(sizes_test4, pyramid_times, label="sax_pyramid")
+
+    # Set labels
+    ax4.set_title("Scaling with Number of Word Lengths")
+    ax4.set_xlabel("Number of word lengths")
+    ax4.set_ylabel("Time taken (s)")
+    ax4.legend()
+
+    # Test SAX for a grid of parameters against the grid engine
+    sax_times, grid_times, sizes_test5 = grid_test()
+    ax5.plot(sizes_test5, sax_times, label="sax per combination")
+    ax5.plot(sizes_test5, grid_times, label="sax_grid")
+
+    for size, sax_time, grid_time in zip(sizes_test5, sax_times, grid_times):
+        print(f"{size} combinations: {sax_time:.2f}s with sax, {grid_time:.2f}s with sax_grid")
+
+    # Set labels
+    ax5.set_title("Scaling with Number of Parameter Combinations")
+    ax5.set_xlabel("Number of combinations")
+    ax5.set_ylabel("Time taken (s)")
+    ax5.legend()
+
     plt.show()
@@ -4,5 +4,18 @@ Author: Nerius Ilmonas
 Date: 15/03/2021
 """
 
-from utils.api import get_stock_data
-from utils.converter import get_time_series, convert_to_event_sequence
+from utils.converter import get_data_path, ensure_stock_data, get_time_series, get_dated_time_series, join_time_series, convert_to_event_sequence, convert_to_event_sequences, convert_to_event_sequence_grid, merge_event_sequences
+
+
+def __getattr__(name):
+    """
+    Lazily import the fetching utilities so that working with
+    already downloaded data does not pay for importing requests
+    or require an API key to be set.
+    """
+
+    if name == "get_stock_data":
+        from utils.api import get_stock_data
+        return get_stock_data
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
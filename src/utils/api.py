@@ -10,32 +10,49 @@ Date: 15/03/2021
 import os
 import requests
 from time import time
-
-# Get API key from environment variables and create request URL
-API_KEY = os.getenv("ALPHA_VANTAGE_KEY")
-
-# Make sure user has set their API key
-if not API_KEY:
-    raise Exception("Alpha Vantage API key has not been set!")
+from utils.converter import get_data_path
 
 BASE_URL = "https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&"
+INTRADAY_URL = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&"
+
+# Bar sizes supported by the intraday endpoint
+INTERVALS = ["1min", "5min", "15min", "30min", "60min"]
 
 
-def get_stock_data(ticker):
+def get_stock_data(ticker, interval=None):
     """
     Downloads 2 years and 12 months worth of stock
     price data based on a specific a stock ticker and 
-    time interval e.g. AAPL 5mins
+    time interval e.g. AAPL 5mins. Without an interval
+    daily bars are downloaded.
     """
 
-    # Create folders for data if they don't exist
-    if os.path.isdir(f"results/{ticker}"):
+    if interval and interval not in INTERVALS:
+        raise Exception(
+            f"Invalid interval provided, expected one of {INTERVALS}")
+
+    path = get_data_path(ticker, interval)
+
+    # Skip fetching if the data has already been downloaded
+    if os.path.isfile(path):
         return 0
-    else:
-        os.mkdir(f"results/{ticker}")
 
-    url = BASE_URL + \
-        f"symbol={ticker}&outputsize=full&datatype=csv&apikey={API_KEY}"
+    # Get API key from environment variables, only once we actually need to fetch
+    api_key = os.getenv("ALPHA_VANTAGE_KEY")
+
+    # Make sure user has set their API key
+    if not api_key:
+        raise Exception("Alpha Vantage API key has not been set!")
+
+    # Create folders for data if they don't exist
+    os.makedirs(f"results/{ticker}", exist_ok=True)
+
+    if interval:
+        url = INTRADAY_URL + \
+            f"symbol={ticker}&interval={interval}&outputsize=full&datatype=csv&apikey={api_key}"
+    else:
+        url = BASE_URL + \
+            f"symbol={ticker}&outputsize=full&datatype=csv&apikey={api_key}"
 
     # Initialise timer
     t1 = time()
@@ -43,7 +60,7 @@ def get_stock_data(ticker):
     print(f"Fetching ${ticker} data...")
 
     # Initialise .csv file
-    with open(f"results/{ticker}/{ticker}.csv", "w") as f:
+    with open(path, "w") as f:
         # Write .csv headers
         print("time,open,high,low,close,volume", file=f)
 
@@ -0,0 +1,73 @@
+"""
+A bounded least recently used cache which can be shared between threads,
+used to keep time series, event sequences and mined FEPTs warm in memory.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class LRUCache:
+    """
+    Maps keys to values computed on demand, evicting the least recently
+    used value once it holds more than max_size values. When several
+    threads ask for the same missing key at once, the value is only
+    computed by the first of them and the others wait for it.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, compute):
+        """
+        Get the value of a key, computing it with compute() if it is not cached
+        """
+
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+            future = self.pending.get(key)
+            if future is None:
+                future = self.pending[key] = Future()
+                self.misses += 1
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as exception:
+            with self.lock:
+                del self.pending[key]
+            future.set_exception(exception)
+            raise
+
+        with self.lock:
+            del self.pending[key]
+            self.entries[key] = value
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+        future.set_result(value)
+        return value
+
+    def to_dict(self):
+        """
+        Return a JSON serialisable summary of the cache
+        """
+
+        return {"size": len(self.entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
@@ -5,30 +5,134 @@ Date: 19/03/2021
 """
 
 import csv
+import os.path
+from heapq import merge
+from operator import attrgetter
 from algorithms import sax
+from algorithms.sax import sax_pyramid, sax_grid
 from structures import Event
 
 
-def get_time_series(ticker):
+def get_data_path(ticker, interval=None):
+    """
+    Get the path of the csv file holding the fetched data for a ticker,
+    intraday data is stored separately for each interval
+    """
+
+    if interval:
+        return f"results/{ticker}/{ticker}_{interval}.csv"
+
+    return f"results/{ticker}/{ticker}.csv"
+
+
+def ensure_stock_data(ticker, interval=None, offline=False):
+    """
+    Make sure the data of a ticker is available locally, fetching it if needed.
+    Offline, previously fetched data has to exist. Returns whether it was fetched.
+    """
+
+    if offline:
+        if not os.path.isfile(get_data_path(ticker, interval)):
+            raise Exception(
+                f"No local data for ${ticker}, run without --offline to fetch it")
+        return False
+
+    # The fetching utilities are only imported when needed
+    from utils.api import get_stock_data
+    return bool(get_stock_data(ticker, interval))
+
+
+def get_time_series(ticker, path=None, interval=None):
     """
     Extract the time series sequence from our csv file
-    by taking the average price for each day (high + low + close) / 3
+    by taking the average price for each bar (high + low + close) / 3.
+    A path to a different csv file in the same format can be given
+    to read local data instead of the fetched data.
+    """
+
+    return [price for _, price in get_dated_time_series(ticker, path, interval)]
+
+
+def get_dated_time_series(ticker, path=None, interval=None):
+    """
+    Extract the time series sequence from our csv file like get_time_series,
+    keeping the time of each bar as (time, price) pairs
     """
 
-    with open(f"results/{ticker}/{ticker}.csv", "r") as f:
+    with open(path or get_data_path(ticker, interval), "r") as f:
         reader = csv.reader(f)
 
         # Skip the column headers
         _ = next(reader)
 
-        return [(float(line[2]) + float(line[3]) + float(line[4])) / 3 for line in reader][::-1]
+        return [(line[0], (float(line[2]) + float(line[3]) + float(line[4])) / 3) for line in reader][::-1]
+
+
+def join_time_series(dated_time_series):
+    """
+    Join the dated time series of several tickers on the times at which all
+    of them have a bar, returning the prices of each ticker at those times.
+    Bars missing from any ticker, e.g. on a holiday of only one exchange,
+    are dropped from all of them, so the bars at each position line up.
+    """
+
+    common_times = set.intersection(
+        *(set(time for time, _ in series) for series in dated_time_series.values()))
+
+    if not common_times:
+        raise Exception(
+            f"The tickers {', '.join(dated_time_series)} have no bars at the same times")
 
+    return {ticker: [price for time, price in series if time in common_times]
+            for ticker, series in dated_time_series.items()}
 
-def convert_to_event_sequence(sequence, word_length, alphabet_size):
+
+def convert_to_event_sequence(sequence, word_length, alphabet_size, profiler=None):
     """
     Convert our time series sequence into a set of events
     by performing the SAX algorithm
     """
 
-    sax_form = sax(sequence, word_length, alphabet_size)
+    sax_form = sax(sequence, word_length, alphabet_size, profiler)
     return [Event(sax_form[i], i + 1) for i in range(len(sax_form))]
+
+
+def convert_to_event_sequences(sequence, word_lengths, alphabet_size, profiler=None):
+    """
+    Convert our time series sequence into one set of events per
+    word length, performing SAX for all word lengths in one pass
+    """
+
+    sax_forms = sax_pyramid(sequence, word_lengths, alphabet_size, profiler)
+    return {word_length: [Event(sax_form[i], i + 1) for i in range(len(sax_form))] for word_length, sax_form in sax_forms.items()}
+
+
+def convert_to_event_sequence_grid(sequence, word_lengths, alphabet_sizes, profiler=None):
+    """
+    Convert our time series sequence into one set of events for every
+    combination of word length and alphabet size, sharing the SAX work
+    between them
+    """
+
+    sax_forms = sax_grid(sequence, word_lengths, alphabet_sizes, profiler)
+    return {parameters: [Event(sax_form[i], i + 1) for i in range(len(sax_form))] for parameters, sax_form in sax_forms.items()}
+
+
+def merge_event_sequences(event_sequences):
+    """
+    Merge the time-aligned event sequences of several tickers, e.g.
+    converted from time series joined with join_time_series, into
+    one event sequence ordered by time, using a streaming k-way merge.
+    Each event type becomes a composite "TICKER:SYMBOL" type so that
+    patterns spanning several tickers can be mined. Events at the
+    same time keep the order in which the tickers are given. Events
+    are merged lazily, so MANEPI+ can consume them without the merged
+    sequence ever being built.
+    """
+
+    def composite_events(ticker, event_sequence):
+        for event in event_sequence:
+            yield Event(f"{ticker}:{event.type}", event.time)
+
+    return merge(*(composite_events(ticker, event_sequence) for ticker, event_sequence in event_sequences.items()),
+                 key=attrgetter("time"))
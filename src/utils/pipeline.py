@@ -0,0 +1,199 @@
+"""
+A staged pipeline runner which overlaps waiting on the network and disk
+with computation. Items flow through the stages over bounded queues, so
+while one ticker is being mined the next is already being fetched and
+the previous one written out.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from time import perf_counter
+
+
+# How a stage is run, in a thread while it waits on I/O or in a separate process while it computes
+STAGE_KINDS = ["io", "cpu"]
+
+# Marks the end of the items on a queue
+DONE = object()
+
+
+def timed(function, item):
+    """
+    Call a stage's function on an item inside its worker, returning the result or the
+    exception it raised along with the time it took. Timing it here leaves out the time
+    the item spent waiting for a free worker of the executor.
+    """
+
+    t1 = perf_counter()
+    try:
+        result, error = function(item), None
+    except Exception as exception:
+        result, error = None, exception
+    t2 = perf_counter()
+
+    return result, error, t2 - t1
+
+
+class Stage:
+    """
+    Represents a step of a pipeline, a function which is called with
+    each item and returns the item for the next stage. Functions of
+    "cpu" stages are run in a process pool, so they and their items
+    must be picklable.
+    """
+
+    def __init__(self, name, function, kind="io", workers=1):
+        if kind not in STAGE_KINDS:
+            raise Exception(
+                f"Invalid stage kind, expected one of {STAGE_KINDS}")
+
+        self.name = name
+        self.function = function
+        self.kind = kind
+        self.workers = workers
+
+        self.n_items = 0
+        self.n_failed = 0
+        self.busy = 0
+
+
+class Pipeline:
+    """
+    Runs items through a list of stages, each with its own workers.
+    An asyncio event loop moves the items between the stages while the
+    work itself happens in a thread pool for "io" stages and a process
+    pool for "cpu" stages. The queues between stages only hold a few
+    items, so a fast stage waits for a slow one instead of piling up
+    items in memory, and the throughput is set by the slowest stage.
+
+    An item whose stage raises an exception is recorded in failures as
+    (item, stage name, exception), with the item as it was given to run,
+    and the other items keep flowing through the pipeline.
+    """
+
+    def __init__(self, stages, queue_size=2):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.time = 0
+        self.failures = []
+
+    def run(self, items):
+        """
+        Run all items through the pipeline, returning the results of the last
+        stage in the order they finish. Failed items are left out of the results.
+        """
+
+        for stage in self.stages:
+            stage.n_items = 0
+            stage.n_failed = 0
+            stage.busy = 0
+
+        self.failures = []
+
+        n_threads = sum(stage.workers for stage in self.stages if stage.kind == "io")
+        n_processes = sum(stage.workers for stage in self.stages if stage.kind == "cpu")
+
+        with ThreadPoolExecutor(max(1, n_threads)) as threads, ProcessPoolExecutor(max(1, n_processes)) as processes:
+            executors = {"io": threads, "cpu": processes}
+
+            t1 = perf_counter()
+            results = asyncio.run(self.pump(items, executors))
+            t2 = perf_counter()
+
+        self.time = t2 - t1
+        return results
+
+    async def pump(self, items, executors):
+        """
+        Feed the items into the first stage and collect the results of the last
+        """
+
+        queues = [asyncio.Queue(self.queue_size) for _ in self.stages]
+        queues.append(asyncio.Queue())
+
+        tasks = [asyncio.create_task(self.feed(items, queues[0], self.stages[0].workers))]
+        for i, stage in enumerate(self.stages):
+            next_workers = self.stages[i + 1].workers if i + 1 < len(self.stages) else 1
+            tasks.append(asyncio.create_task(self.work(
+                stage, executors[stage.kind], queues[i], queues[i + 1], next_workers)))
+
+        # Failures of single items are recorded by the workers, so this only stops
+        # every stage when the pipeline itself breaks, e.g. a worker process dies
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        results = []
+        while (entry := queues[-1].get_nowait()) is not DONE:
+            results.append(entry[1])
+
+        return results
+
+    async def feed(self, items, queue, workers):
+        """
+        Put the items on the queue of the first stage, each along with
+        itself so that failures can be reported for the original item
+        """
+
+        for item in items:
+            await queue.put((item, item))
+
+        for _ in range(workers):
+            await queue.put(DONE)
+
+    async def work(self, stage, executor, in_queue, out_queue, next_workers):
+        """
+        Run the workers of a stage until its items run out, then
+        tell every worker of the next stage that it is done
+        """
+
+        await asyncio.gather(*[self.worker(stage, executor, in_queue, out_queue)
+                               for _ in range(stage.workers)])
+
+        for _ in range(next_workers):
+            await out_queue.put(DONE)
+
+    async def worker(self, stage, executor, in_queue, out_queue):
+        """
+        Take items off a queue, run the stage on them and put the results on the next queue
+        """
+
+        loop = asyncio.get_running_loop()
+
+        while (entry := await in_queue.get()) is not DONE:
+            original, item = entry
+            result, error, busy = await loop.run_in_executor(executor, timed, stage.function, item)
+
+            stage.n_items += 1
+            stage.busy += busy
+
+            if error is not None:
+                stage.n_failed += 1
+                self.failures.append((original, stage.name, error))
+                continue
+
+            await out_queue.put((original, result))
+
+    def summary(self):
+        """
+        Return a human readable summary of the time each stage was busy. The
+        utilization of a stage is the fraction of the run its workers were busy,
+        so the slowest stage is close to 100% and limits the throughput.
+        """
+
+        width = max([16] + [len(stage.name) + 2 for stage in self.stages])
+
+        lines = ["Stage".ljust(width) + f"{'Workers':<10}{'Items':<10}{'Failed':<10}{'Busy (s)':<12}Utilization"]
+        for stage in self.stages:
+            utilization = stage.busy / (self.time * stage.workers) if self.time else 0
+            lines.append(
+                f"{stage.name:<{width}}{stage.workers:<10}{stage.n_items:<10}{stage.n_failed:<10}{stage.busy:<12.3f}{utilization * 100:.1f}%")
+
+        lines.append("")
+        lines.append(f"{'Total time (s)':<{width}}{self.time:.3f}")
+        lines.append(
+            f"{'Sequential (s)':<{width}}{sum(stage.busy for stage in self.stages):.3f}")
+
+        return "\n".join(lines)
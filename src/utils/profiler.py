@@ -0,0 +1,229 @@
+"""
+Lightweight instrumentation for the mining pipeline. Records how many
+candidate episodes MANEPI+ generates and prunes at each depth, as well
+as the wall time and tracemalloc peak of each stage of a run.
+"""
+
+import tracemalloc
+from contextlib import contextmanager
+from time import perf_counter
+
+
+# Outcomes a candidate episode can have during episode growth, frequent
+# episodes which are covered are not grown when mining closed or maximal ones
+COUNTERS = ["candidates", "suffix_pruned",
+            "occurrence_pruned", "support_pruned", "frequent", "covered"]
+
+
+class MiningStats:
+    """
+    Counts candidate episodes and the reason they were discarded,
+    broken down by episode length (depth in the FEPT).
+    """
+
+    def __init__(self):
+        self.depths = {}
+
+    def count(self, depth, counter, amount=1):
+        """
+        Increment a counter for a given depth
+        """
+
+        if depth not in self.depths:
+            self.depths[depth] = dict.fromkeys(COUNTERS, 0)
+
+        self.depths[depth][counter] += amount
+
+    @property
+    def totals(self):
+        """
+        Return the counters summed over all depths
+        """
+
+        totals = dict.fromkeys(COUNTERS, 0)
+        for counters in self.depths.values():
+            for counter, value in counters.items():
+                totals[counter] += value
+
+        return totals
+
+    def to_dict(self):
+        """
+        Return a JSON serialisable version of the statistics
+        """
+
+        return {
+            "totals": self.totals,
+            "depths": {str(depth): counters for depth, counters in sorted(self.depths.items())}
+        }
+
+
+class Profiler:
+    """
+    Times the stages of a run and records their tracemalloc peak.
+    When disabled, stages are no-ops so the profiler can always be
+    passed around without affecting the run.
+    """
+
+    def __init__(self, enabled=True, cprofile=False):
+        self.enabled = enabled
+        self.stages = []
+        self.counters = {}
+        self.mining_stats = {}
+        self.cprofile = None
+
+        if enabled and cprofile:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+
+        self._stack = []
+
+    def start(self):
+        """
+        Start tracing memory allocations (and cProfile if requested)
+        """
+
+        if not self.enabled:
+            return
+
+        tracemalloc.start()
+        if self.cprofile:
+            self.cprofile.enable()
+
+    def stop(self):
+        """
+        Stop tracing memory allocations (and cProfile if requested)
+        """
+
+        if not self.enabled:
+            return
+
+        if self.cprofile:
+            self.cprofile.disable()
+        tracemalloc.stop()
+
+    def set_counter(self, name, value):
+        """
+        Record an arbitrary value about the run, e.g. the word length used
+        """
+
+        if self.enabled:
+            self.counters[name] = value
+
+    def new_mining_stats(self, name):
+        """
+        Get a new statistics collector for one mining run, e.g. one
+        resolution, so counts of different runs are kept apart.
+        Returns None when disabled.
+        """
+
+        if not self.enabled:
+            return None
+
+        self.mining_stats[name] = MiningStats()
+        return self.mining_stats[name]
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager measuring the wall time and peak traced
+        memory of the code it wraps. Stages may be nested.
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        tracing = tracemalloc.is_tracing()
+
+        # Hand the peak so far to the enclosing stage before resetting it
+        if tracing:
+            _, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+
+        frame = {"name": name, "peak": 0, "depth": len(self._stack)}
+        self._stack.append(frame)
+        self.stages.append(frame)
+
+        t1 = perf_counter()
+        try:
+            yield
+        finally:
+            t2 = perf_counter()
+            frame["time"] = t2 - t1
+
+            if tracing:
+                _, peak = tracemalloc.get_traced_memory()
+                frame["peak"] = max(frame["peak"], peak)
+                tracemalloc.reset_peak()
+
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1]["peak"] = max(
+                    self._stack[-1]["peak"], frame["peak"])
+
+    def to_dict(self):
+        """
+        Return a JSON serialisable report of the run
+        """
+
+        return {
+            "stages": [{"name": stage["name"], "depth": stage["depth"], "time": stage["time"], "peak": stage["peak"]} for stage in self.stages],
+            "counters": self.counters,
+            "mining": {name: stats.to_dict() for name, stats in self.mining_stats.items()}
+        }
+
+    def summary(self):
+        """
+        Return a human readable summary of the run
+        """
+
+        names = ["  " * stage["depth"] + stage["name"]
+                 for stage in self.stages] + list(self.counters)
+        width = max([36] + [len(name) + 2 for name in names])
+
+        lines = ["Stage".ljust(width) + "Time (s)" + " " * 4 + "Peak (MiB)"]
+        for stage in self.stages:
+            name = "  " * stage["depth"] + stage["name"]
+            lines.append(
+                f"{name:<{width}}{stage['time']:<12.3f}{stage['peak'] / 2**20:.2f}")
+
+        if self.counters:
+            lines.append("")
+            for name, value in self.counters.items():
+                lines.append(f"{name:<{width}}{value}")
+
+        for name, stats in self.mining_stats.items():
+            if not stats.depths:
+                continue
+
+            lines.append("")
+            lines.append(f"Mining ({name})")
+            lines.append("Depth" + "".join(f"{c:>19}" for c in COUNTERS))
+            for depth, counters in sorted(stats.depths.items()):
+                lines.append(f"{depth:<5}" + "".join(
+                    f"{counters[c]:>19}" for c in COUNTERS))
+            totals = stats.totals
+            lines.append("Total" + "".join(
+                f"{totals[c]:>19}" for c in COUNTERS))
+
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """
+        Write the report to a file. Paths ending in .prof or .pstats
+        receive the cProfile statistics, anything else a JSON report.
+        """
+
+        if path.endswith((".prof", ".pstats")):
+            if not self.cprofile:
+                raise Exception(
+                    "cProfile was not enabled for this run")
+            self.cprofile.dump_stats(path)
+            return
+
+        import json
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)